@@ -1,15 +1,49 @@
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from src.worklog import get_routes
+from src.worklog.db.core import init_engine, dispose_engine
+from src.worklog.db.instrumentation import query_stats_middleware
+from src.worklog.queue.service import publisher
+from src.worklog.ai.whatsapp_handler import whatsapp
+from src.worklog.ai.anthropic_client import anthropic_client
+from src.worklog.ai.tools import tool_registry
+from src.worklog.ai.webhook_consumer import webhook_consumer
+from src.worklog.ai.chat_consumer import chat_consumer
+from src.worklog.notifications.dispatcher import dispatcher as outbox_dispatcher
+from src.worklog.config.config import settings
 import os
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_engine()
+    await publisher.start()
+    await whatsapp.start()
+    if settings.OUTBOX_ENABLED:
+        outbox_dispatcher.start()
+    if settings.AI_WORKERS_ENABLED:
+        webhook_consumer.start()
+        await chat_consumer.start()
+    yield
+    await chat_consumer.stop()
+    await webhook_consumer.stop()
+    await outbox_dispatcher.stop()
+    await tool_registry.close()
+    await anthropic_client.close()
+    await whatsapp.close()
+    await publisher.close()
+    await dispose_engine()
+
+
 app = FastAPI(
     title="WorkLog - система управление задачами",
     version="2.1.0",
     description="Новая версия на новым движке. FastAPI",
+    lifespan=lifespan,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +56,7 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+app.middleware("http")(query_stats_middleware)
 
 get_routes(app)
 
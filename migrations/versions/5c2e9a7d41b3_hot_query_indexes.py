@@ -0,0 +1,104 @@
+"""hot query indexes
+
+Revision ID: 5c2e9a7d41b3
+Revises: cfee15d4917d
+Create Date: 2026-10-18 09:12:44.318205
+
+Индексы создаются через CREATE INDEX CONCURRENTLY, поэтому таблицы не
+блокируются на запись. Перед уникальными индексами удаляются дубликаты
+в таблицах-связках (остаётся строка с минимальным id) — иначе
+CONCURRENTLY оставит невалидный индекс.
+
+Проверка планов до/после (ожидается Seq Scan -> Index Scan / Bitmap Index Scan):
+
+    -- /api/v1/tasks/my-tasks
+    EXPLAIN ANALYZE SELECT tasks.* FROM tasks
+        JOIN task_assignees ON tasks.id = task_assignees.task_id
+        WHERE task_assignees.user_id = 1;
+    -- /api/v1/tasks/task/details/{id}, add-user
+    EXPLAIN ANALYZE SELECT * FROM task_assignees WHERE task_id = 1 AND user_id = 1;
+    -- /api/v1/tasks/department-tasks
+    EXPLAIN ANALYZE SELECT tasks.* FROM tasks
+        JOIN task_departments ON tasks.id = task_departments.task_id
+        WHERE task_departments.department_id = 1;
+    -- количество сотрудников в departments / shifts
+    EXPLAIN ANALYZE SELECT count(*) FROM users WHERE department_id = 1;
+    -- webhook: поиск пользователя по чату
+    EXPLAIN ANALYZE SELECT * FROM users WHERE chat_id_whatsapp = '77070000000@s.whatsapp.net';
+    -- blocks: счётчики скважин
+    EXPLAIN ANALYZE SELECT * FROM wells WHERE block_id = 1 AND out = false;
+    -- ai: история диалога
+    EXPLAIN ANALYZE SELECT * FROM agent_messages WHERE user_id = 1 ORDER BY created_at;
+    EXPLAIN ANALYZE SELECT * FROM notifications WHERE user_id = 1;
+    -- /api/v1/acts/{id}, /api/v1/acts/{id}/report
+    EXPLAIN ANALYZE SELECT * FROM act_items_4 WHERE act_id = 1;
+    EXPLAIN ANALYZE SELECT * FROM act_and_task_relation_4 WHERE act_item_id = 1;
+    -- reshifts
+    EXPLAIN ANALYZE SELECT * FROM reshift_users WHERE first_user_id = 1 OR second_user_id = 1;
+    -- проверка прав
+    EXPLAIN ANALYZE SELECT * FROM role_permissions WHERE permission_id = 1 AND role_id = 1;
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e9a7d41b3'
+down_revision: Union[str, None] = 'cfee15d4917d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('ix_task_assignees_user_id', 'task_assignees', ['user_id'], False),
+    ('uq_task_assignees_task_id_user_id', 'task_assignees', ['task_id', 'user_id'], True),
+    ('ix_task_departments_department_id', 'task_departments', ['department_id'], False),
+    ('uq_task_departments_task_id_department_id', 'task_departments', ['task_id', 'department_id'], True),
+    ('ix_users_department_id', 'users', ['department_id'], False),
+    ('ix_users_chat_id_whatsapp', 'users', ['chat_id_whatsapp'], False),
+    ('ix_wells_block_id_out', 'wells', ['block_id', 'out'], False),
+    ('ix_agent_messages_user_id_created_at', 'agent_messages', ['user_id', 'created_at'], False),
+    ('ix_notifications_user_id', 'notifications', ['user_id'], False),
+    ('ix_act_items_4_act_id', 'act_items_4', ['act_id'], False),
+    ('uq_act_and_task_relation_4_act_item_id', 'act_and_task_relation_4', ['act_item_id'], True),
+    ('ix_reshift_users_first_user_id', 'reshift_users', ['first_user_id'], False),
+    ('ix_reshift_users_second_user_id', 'reshift_users', ['second_user_id'], False),
+    ('uq_role_permissions_role_id_permission_id', 'role_permissions', ['role_id', 'permission_id'], True),
+]
+
+
+def _delete_duplicates(table: str, columns: list[str]) -> None:
+    condition = ' AND '.join(f'a.{column} = b.{column}' for column in columns)
+    op.execute(f'DELETE FROM {table} a USING {table} b WHERE a.id > b.id AND {condition}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for _, table, columns, unique in INDEXES:
+        if unique:
+            _delete_duplicates(table, columns)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=unique,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
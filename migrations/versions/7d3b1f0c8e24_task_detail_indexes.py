@@ -0,0 +1,59 @@
+"""task detail indexes
+
+Revision ID: 7d3b1f0c8e24
+Revises: 5c2e9a7d41b3
+Create Date: 2026-10-18 11:40:02.517390
+
+Счётчики чек-листа, комментариев и файлов в /api/v1/tasks/task/details/{id}
+считаются коррелированными подзапросами по task_id:
+
+    EXPLAIN ANALYZE SELECT count(*) FROM task_comments WHERE task_id = 1;
+    EXPLAIN ANALYZE SELECT count(*) FROM task_files WHERE task_id = 1;
+    EXPLAIN ANALYZE SELECT count(*) FROM task_checklist_item
+        JOIN task_checklist ON task_checklist.id = task_checklist_item.checklist_id
+        WHERE task_checklist.task_id = 1;
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3b1f0c8e24'
+down_revision: Union[str, None] = '5c2e9a7d41b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_task_checklist_task_id', 'task_checklist', ['task_id']),
+    ('ix_task_checklist_item_checklist_id', 'task_checklist_item', ['checklist_id']),
+    ('ix_task_comments_task_id', 'task_comments', ['task_id']),
+    ('ix_task_files_task_id', 'task_files', ['task_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,28 @@
+"""outbox coalescing
+
+Revision ID: b81f3e5a2c60
+Revises: a4e6c2d9b715
+Create Date: 2026-10-18 15:21:48.663520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f3e5a2c60'
+down_revision: Union[str, None] = 'a4e6c2d9b715'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notification_outbox', sa.Column('coalescible', sa.Boolean(), server_default='true', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notification_outbox', 'coalescible')
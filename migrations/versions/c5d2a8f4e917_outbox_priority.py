@@ -0,0 +1,30 @@
+"""outbox priority and dead letters
+
+Revision ID: c5d2a8f4e917
+Revises: b81f3e5a2c60
+Create Date: 2026-10-18 16:04:12.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d2a8f4e917'
+down_revision: Union[str, None] = 'b81f3e5a2c60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notification_outbox', sa.Column('priority', sa.SmallInteger(), server_default='2', nullable=False))
+    op.execute("UPDATE notification_outbox SET status = 'dead' WHERE status = 'failed'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE notification_outbox SET status = 'failed' WHERE status = 'dead'")
+    op.drop_column('notification_outbox', 'priority')
@@ -0,0 +1,30 @@
+"""agent messages external id
+
+Revision ID: f1b9d5c3a286
+Revises: e6a4c2b8d173
+Create Date: 2026-10-18 17:58:44.602971
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b9d5c3a286'
+down_revision: Union[str, None] = 'e6a4c2b8d173'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('agent_messages', sa.Column('external_id', sa.String(length=255), nullable=True))
+    op.create_unique_constraint('uq_agent_messages_external_id', 'agent_messages', ['external_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_agent_messages_external_id', 'agent_messages', type_='unique')
+    op.drop_column('agent_messages', 'external_id')
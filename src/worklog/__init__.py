@@ -14,6 +14,7 @@ from .users.views import router as user_router
 from .lvl4_act.views import router as lvl4_act_router
 from .ai.views import router as ai_router
 from .reshift.views import router as reshift_router
+from .metrics.views import router as metrics_router
 
 def get_routes(app):
     app.include_router(auth_router)
@@ -32,5 +33,6 @@ def get_routes(app):
     app.include_router(lvl4_act_router)
     # app.include_router(ai_router)
     app.include_router(reshift_router)
+    app.include_router(metrics_router)
 
     return app
@@ -0,0 +1,111 @@
+import time
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.worklog.config.config import settings
+from src.worklog.metrics.service import metrics
+from .models import AIAgent, AgentToolsData
+
+
+def compile_tool(tool: AgentToolsData) -> dict:
+    return {
+        "type": "custom",
+        "name": f"{tool.tool_name}",
+        "description": f"{tool.tool_type.value} tool with {tool.tool_method.value} method",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                **tool.tool_properties
+            },
+            "required": tool.tool_required
+        }
+    }
+
+
+class CompiledAgent:
+    """Готовое к отправке в API описание агента; не изменять - объект общий для запросов"""
+
+    def __init__(self, agent_id: int, name: str, model: str, system_prefix: str, tools: list[dict], version: tuple):
+        self.agent_id = agent_id
+        self.name = name
+        self.model = model
+        self.system_prefix = system_prefix
+        self.tools = tools
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def system(self, dynamic: str) -> list[dict]:
+        # Постоянная часть (инструменты и промпт агента) кэшируется на стороне API,
+        # данные пользователя идут после точки кэширования
+        return [
+            {"type": "text", "text": self.system_prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": dynamic},
+        ]
+
+
+class AgentCache:
+    """
+    Скомпилированные агенты в памяти воркера. Версия агента - updated_at
+    агента и его инструментов и число инструментов; раз в ttl секунд она
+    сверяется с БД одним лёгким запросом, так что правки в других воркерах
+    тоже подхватываются. Правки в этом воркере сбрасывают запись сразу.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._agents: dict[int, CompiledAgent] = {}
+
+    def invalidate(self, agent_id: int):
+        self._agents.pop(agent_id, None)
+
+    async def _version(self, db: AsyncSession, agent_id: int) -> Optional[tuple]:
+        agent_tools = AgentToolsData.agent_id == agent_id
+        row = (await db.execute(
+            select(
+                AIAgent.updated_at,
+                select(func.max(AgentToolsData.updated_at)).where(agent_tools).scalar_subquery(),
+                select(func.count(AgentToolsData.id)).where(agent_tools).scalar_subquery(),
+            )
+            .where(AIAgent.id == agent_id)
+        )).first()
+        return tuple(row) if row else None
+
+    async def get(self, db: AsyncSession, agent_id: int) -> Optional[CompiledAgent]:
+        cached = self._agents.get(agent_id)
+        if cached is not None and time.monotonic() - cached.checked_at < self.ttl:
+            metrics.inc("ai.agent_cache", result="hit")
+            return cached
+
+        version = await self._version(db, agent_id)
+        if version is None:
+            self.invalidate(agent_id)
+            return None
+        if cached is not None and cached.version == version:
+            cached.checked_at = time.monotonic()
+            metrics.inc("ai.agent_cache", result="revalidated")
+            return cached
+
+        metrics.inc("ai.agent_cache", result="miss")
+        compiled = await self._compile(db, agent_id, version)
+        self._agents[agent_id] = compiled
+        return compiled
+
+    async def _compile(self, db: AsyncSession, agent_id: int, version: tuple) -> CompiledAgent:
+        agent = await db.get(AIAgent, agent_id, populate_existing=True)
+        tools_db = await db.execute(
+            select(AgentToolsData).where(AgentToolsData.agent_id == agent_id).order_by(AgentToolsData.id)
+        )
+        tools = [compile_tool(tool) for tool in tools_db.scalars().all()]
+        return CompiledAgent(
+            agent_id=agent.id,
+            name=agent.name,
+            model=agent.model.value,
+            system_prefix=f'Ваш зовут: {agent.name} \n\n {agent.system_message}',
+            tools=tools,
+            version=version,
+        )
+
+
+agent_cache = AgentCache(ttl=settings.AI_AGENT_CACHE_TTL)
@@ -1,32 +1,38 @@
+import asyncio
 import anthropic
 from src.worklog.config.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.worklog.ai.service import AIService
 from src.worklog.ai.models import *
 from sqlalchemy import insert
-from .whatsapp_handler import WhatsappHandler
 from sqlalchemy import select
-import httpx
-from src.worklog.queue.service import RabbitMQPublisher
+from src.worklog.queue.service import publisher
+from .anthropic_client import anthropic_client
+from .tools import tool_registry
+from .intents import IntentRouter
+from .routing import route_model
+from src.worklog.db.core import async_session_factory
+from src.worklog.metrics.service import metrics
+from src.worklog.notifications.service import NotificationService
+from src.worklog.notifications.models import NotificationPriority
+from src.worklog.notifications.dispatcher import dispatcher as outbox_dispatcher
 
 class AIHandler:
     def __init__(self, db: AsyncSession):
-        self.client = anthropic.Anthropic(
-            api_key="sk-ant-REDACTED"
-        )
-        self.model = "claude-3-5-sonnet-20241022"
-        self.max_tokens = 1000
+        self.client = anthropic_client
+        self.model = settings.ANTHROPIC_MODEL
+        self.max_tokens = settings.ANTHROPIC_MAX_TOKENS
         self.temperature = 1
         self.db = db
         self.ai_service = AIService(db)
-        self.whatsapp_handler = WhatsappHandler()
-        self.rabbitmq_publisher = RabbitMQPublisher()
+        self.notifications = NotificationService(db)
+        self.rabbitmq_publisher = publisher
 
-    async def _set_creator(self, system: str, messages: list, tools: list):
+    async def _set_creator(self, system: str, messages: list, tools: list, model: str = None, max_tokens: int = None):
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
+            message = await self.client.create_message(
+                model=model or self.model,
+                max_tokens=max_tokens or self.max_tokens,
                 temperature=self.temperature,
                 system=system,
                 messages=messages,
@@ -38,7 +44,7 @@ class AIHandler:
         except Exception as e:
             return {"error": f"Error calling Anthropic API: {str(e)}"}
     
-    async def process_agent_request(self, agent_id: int, user_id: int):
+    async def process_agent_request(self, agent_id: int, user_id: int, follow_up_model: str = None):
         """
         Process an agent request by getting the agent data from AIService
         and then sending it to the Anthropic API.
@@ -46,10 +52,23 @@ class AIHandler:
         Args:
             agent_id: The ID of the agent to use
             user_id: The ID of the user making the request
+            follow_up_model: The model that made the tool calls this turn answers
             
         Returns:
             A dictionary containing the response from the Anthropic API
         """
+        # Ход из очереди мог устареть: предыдущий ход уже ответил на всё
+        if not await self._awaits_answer(user_id):
+            metrics.inc("ai.turns_skipped")
+            return {"response": None}
+
+        # Типовые команды отвечаются сразу по БД, без вызова модели
+        if settings.AI_INTENTS_ENABLED:
+            reply = await IntentRouter(self.db).try_answer(user_id)
+            if reply is not None:
+                await self._save_response(agent_id, user_id, reply)
+                return {"response": reply}
+
         # Get agent data from AIService
         agent_data = await self.ai_service._set_agent(agent_id, user_id)
         
@@ -61,47 +80,52 @@ class AIHandler:
         system_message = agent_data["system_message"]
         messages = agent_data["messages"]
         tools = agent_data["tools"]
+
+        # Простые ходы уходят в быструю модель
+        route = route_model(agent_data["agent_model"], messages, agent_data["context_tokens"], follow_up_model)
         
         # Send the request to the Anthropic API
-        response = await self._set_creator(system_message, messages, tools)
+        response = await self._set_creator(system_message, messages, tools, route.model, route.max_tokens)
         
         # Check if there was an error
         if "error" in response:
             return response
         
         # Process the response and save it to the database
-        await self._process_response(agent_id, user_id, response)
+        await self._process_response(agent_id, user_id, response, route.model)
         
         # Return a properly formatted response
         return {"response": self._extract_text_content(response)}
     
-    async def _process_response(self, agent_id: int, user_id: int, response):
+    async def _awaits_answer(self, user_id: int) -> bool:
+        """Последнее сообщение диалога - от пользователя (текст или результаты инструментов)"""
+        last_role = await self.db.execute(
+            select(AgentMessages.role)
+            .where(AgentMessages.user_id == user_id)
+            .order_by(AgentMessages.id.desc())
+            .limit(1)
+        )
+        return last_role.scalar() == 'user'
+
+    async def _process_response(self, agent_id: int, user_id: int, response, model: str = None):
         """
         Process the response from the Anthropic API and save it to the database.
-        This method handles both text responses and tool use responses.
+        All tool_use blocks of the turn are executed, not only the last one.
         """
-        # Проверяем, содержит ли ответ вызов инструмента
-        tool_use = False
-        tool_name = None
-        tool_id = None
-        tool_input = None
         text_content = ""
-        
+        tool_uses = []
+
         # Обработка содержимого ответа
         if hasattr(response, 'content'):
             for content_block in response.content:
                 if content_block.type == 'text':
                     text_content += content_block.text + "\n"
                 elif content_block.type == 'tool_use':
-                    tool_use = True
-                    tool_name = content_block.name
-                    tool_id = content_block.id
-                    tool_input = content_block.input
-                    
-
-        await self._save_response(agent_id, user_id, text_content, tool_use, tool_name, tool_id, tool_input)
-        if tool_use == True:
-            await self._save_tool_use(agent_id, user_id, tool_name, tool_id, tool_input)
+                    tool_uses.append(content_block)
+
+        await self._save_response(agent_id, user_id, text_content, tool_uses)
+        if tool_uses:
+            await self._run_tools(agent_id, user_id, tool_uses, model)
     
     def _extract_text_content(self, response):
         """
@@ -114,142 +138,122 @@ class AIHandler:
                     content += block.text + "\n"
         return content.strip()
     
-    async def _save_response(self, agent_id: int, user_id: int, content: str, tool_use: bool = False, 
-                            tool_name: str = None, tool_id: str = None, tool_input: dict = None):
+    async def _save_response(self, agent_id: int, user_id: int, content: str, tool_uses: list = ()):
         """
         Save the response from the Anthropic API to the database.
+        Each tool call of the turn is stored as its own row; the text goes with the first one.
         
         Args:
             agent_id: The ID of the agent
             user_id: The ID of the user
             content: The text content to save
-            tool_use: Whether the response contains a tool use
-            tool_name: The name of the tool used
-            tool_id: The ID of the tool use
-            tool_input: The input to the tool
+            tool_uses: The tool_use blocks of the response
         """
-        message_record = {
-            "agent_id": agent_id,
-            "user_id": user_id,
-            "content": content,
-            "type_message": "text",
-            "role": "assistant",
-            "tool_use": tool_use,
-            "tool_name": tool_name,
-            "tool_id": tool_id,
-            "tool_input": tool_input,
-            "tool_output": None,
-        }
+        message_records = []
+        for index, tool in enumerate(tool_uses or [None]):
+            message_records.append({
+                "agent_id": agent_id,
+                "user_id": user_id,
+                "content": content if index == 0 else "",
+                "type_message": "text",
+                "role": "assistant",
+                "tool_use": tool is not None,
+                "tool_name": tool.name if tool else None,
+                "tool_id": tool.id if tool else None,
+                "tool_input": tool.input if tool else None,
+                "tool_output": None,
+            })
         
         await self.db.execute(
             insert(AgentMessages),
-            [message_record]
+            message_records
         )
+        # Ответ уходит через outbox отдельным классом: без дайджеста и лимита получателя
+        if content.strip():
+            self._enqueue_reply(content, user_id)
         await self.db.commit()
-        chat_id = await self.ai_service._get_user_connection(user_id)
-        data = await self.whatsapp_handler.send_message(content, chat_id)
-    
-    async def _save_tool_use(self, agent_id: int, user_id: int, tool_name: str, tool_id: str, tool_input: dict):
+        outbox_dispatcher.wake()
+
+    def _enqueue_reply(self, content: str, user_id: int):
+        self.notifications.enqueue_whatsapp(
+            content,
+            user_id=user_id,
+            coalesce=False,
+            priority=NotificationPriority.REPLY,
+        )
+
+    async def _execute_tool(self, tool: AgentToolsData, tool_input: dict):
+        # Каждый вызов в своей сессии: ошибка или таймаут инструмента не ломают self.db
+        async with async_session_factory() as session:
+            return await tool_registry.execute(session, tool, tool_input)
+
+    async def _run_tools(self, agent_id: int, user_id: int, tool_uses: list, model: str = None):
         """
-        Execute a tool by making an HTTP request to the specified URL and save the response to the database.
-        
+        Execute all tool calls of a turn concurrently, each with its own timeout,
+        save the results and ask for one follow-up model turn.
+
         Args:
             agent_id: The ID of the agent
             user_id: The ID of the user
-            tool_name: The name of the tool used
-            tool_id: The ID of the tool use
-            tool_input: The input to the tool (will be used as request body or params)
+            tool_uses: The tool_use blocks of the response
+            model: The model that made the calls; the follow-up turn stays on it
         """
         # Get the tool details from the database
         tools_db = await self.db.execute(
             select(AgentToolsData).where(
                 AgentToolsData.agent_id == agent_id,
-                AgentToolsData.tool_name == tool_name
+                AgentToolsData.tool_name.in_({tool_use.name for tool_use in tool_uses})
             )
         )
-        tool = tools_db.scalars().first()
-        
-        if not tool:
-            return {"error": f"Tool {tool_name} not found"}
-        
-        # Prepare the request
-        url = tool.tool_url
-        method = tool.tool_method.value.lower()
-        headers = tool.tool_headers or {}
-        body = tool_input
-        
-        # Execute the request
-        try:
-            async with httpx.AsyncClient() as client:
-                if method == 'get':
-                    response = await client.get(url, headers=headers, params=body)
-                elif method == 'post':
-                    response = await client.post(url, headers=headers, json=body)
-                elif method == 'put':
-                    response = await client.put(url, headers=headers, json=body)
-                elif method == 'delete':
-                    response = await client.delete(url, headers=headers, params=body)
-                else:
-                    return {"error": f"Unsupported method: {method}"}
-                
-                # Get the response data
-                response_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else response.text
-                
-                # Save the tool use and response to the database
-                message_record = {
-                    "agent_id": agent_id,
-                    "user_id": user_id,
-                    "content": f"tool",
-                    "type_message": "tool_result",
-                    "role": "user",
-                    "tool_use": True,
-                    "tool_name": tool_name,
-                    "tool_id": tool_id,
-                    "tool_input": tool_input,
-                    "tool_output": response_data,
-                }
-                
-                await self.db.execute(
-                    insert(AgentMessages),
-                    [message_record]
+        tools = {}
+        for tool in tools_db.scalars().all():
+            tools.setdefault(tool.tool_name, tool)
+
+        async def run(tool_use):
+            tool = tools.get(tool_use.name)
+            if not tool:
+                return {"error": f"Tool {tool_use.name} not found"}
+            try:
+                return await asyncio.wait_for(
+                    self._execute_tool(tool, tool_use.input),
+                    timeout=settings.AI_TOOL_TIMEOUT,
                 )
-                await self.db.commit()
-                
-                # Send the response to the user via WhatsApp
-                self.rabbitmq_publisher.send({
-                    "chat_id": user_id,
-                    "message": "new"
-                })                
-                
-                return {"success": True, "response": response_data}
-                
-        except Exception as e:
-            error_message = f"Error executing tool {tool_name}: {str(e)}"
-            
-            # Save the error to the database
-            message_record = {
+            except asyncio.TimeoutError:
+                metrics.inc("ai.tool_timeouts", tool=tool_use.name)
+                return {"error": f"Tool {tool_use.name} timed out after {settings.AI_TOOL_TIMEOUT}s"}
+            except Exception as e:
+                return {"error": f"Error executing tool {tool_use.name}: {str(e)}"}
+
+        results = await asyncio.gather(*(run(tool_use) for tool_use in tool_uses))
+
+        # Результаты, в том числе ошибки, возвращаются модели одним ходом
+        await self.db.rollback()
+        message_records = [
+            {
                 "agent_id": agent_id,
                 "user_id": user_id,
-                "content": error_message,
-                "type_message": "tool",
-                "role": "assistant",
+                "content": "tool",
+                "type_message": "tool_result",
+                "role": "user",
                 "tool_use": True,
-                "tool_name": tool_name,
-                "tool_id": tool_id,
-                "tool_input": tool_input,
-                "tool_output": {"error": str(e)},
+                "tool_name": tool_use.name,
+                "tool_id": tool_use.id,
+                "tool_input": tool_use.input,
+                "tool_output": result,
             }
-            
-            await self.db.execute(
-                insert(AgentMessages),
-                [message_record]
-            )
-            await self.db.commit()
-            
-            # Send the error to the user via WhatsApp
-            chat_id = await self.ai_service._get_user_connection(user_id)
-            await self.whatsapp_handler.send_message(error_message, chat_id)
-            
-            return {"error": error_message}
+            for tool_use, result in zip(tool_uses, results)
+        ]
+        await self.db.execute(
+            insert(AgentMessages),
+            message_records
+        )
+        await self.db.commit()
 
+        # Продолжение хода после инструментов агент запускает без debounce
+        await self.rabbitmq_publisher.send({
+            "chat_id": user_id,
+            "message": "tool_result",
+            "model": model
+        })
 
+        return {"success": True, "response": results}
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import Optional
+
+import anthropic
+
+from src.worklog.config.config import settings
+from src.worklog.metrics.service import metrics
+
+
+class AnthropicClient:
+    """
+    Асинхронный клиент Anthropic, один на воркер. Число одновременных
+    вызовов модели ограничено семафором, чтобы долгие ответы не выбирали
+    все соединения и не упирались в лимиты API.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        max_concurrency: int,
+        timeout: float,
+        connect_timeout: float,
+        max_retries: int,
+    ):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[anthropic.AsyncAnthropic] = None
+
+    @property
+    def client(self) -> anthropic.AsyncAnthropic:
+        if self._client is None:
+            self._client = anthropic.AsyncAnthropic(
+                api_key=self.api_key,
+                timeout=anthropic.Timeout(self.timeout, connect=self.connect_timeout),
+                # Повторы с экспоненциальной задержкой на 429, 5xx и сетевых ошибках делает SDK
+                max_retries=self.max_retries,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    @staticmethod
+    def _record_usage(model: str, usage):
+        if usage is None:
+            return
+        metrics.inc("anthropic.input_tokens", usage.input_tokens or 0, model=model)
+        metrics.inc("anthropic.output_tokens", usage.output_tokens or 0, model=model)
+        # Попадания в кэш промпта (статический префикс агента)
+        metrics.inc("anthropic.cache_read_tokens", getattr(usage, "cache_read_input_tokens", None) or 0, model=model)
+
+    async def create_message(self, **kwargs):
+        model = kwargs.get("model")
+        started = time.perf_counter()
+        async with self._semaphore:
+            metrics.observe("anthropic.wait_seconds", time.perf_counter() - started)
+            status = "error"
+            called = time.perf_counter()
+            try:
+                message = await self.client.messages.create(**kwargs)
+                status = "ok"
+                self._record_usage(model, message.usage)
+                return message
+            finally:
+                metrics.observe("anthropic.call_seconds", time.perf_counter() - called, model=model, status=status)
+
+
+anthropic_client = AnthropicClient(
+    api_key=settings.GET_ANTHROPIC_API_KEY,
+    max_concurrency=settings.ANTHROPIC_MAX_CONCURRENCY,
+    timeout=settings.ANTHROPIC_TIMEOUT,
+    connect_timeout=settings.ANTHROPIC_CONNECT_TIMEOUT,
+    max_retries=settings.ANTHROPIC_MAX_RETRIES,
+)
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Optional
+
+import aio_pika
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+
+from src.worklog.config.config import settings
+from src.worklog.db.core import async_session_factory
+from src.worklog.metrics.service import metrics
+from .ai_handler import AIHandler
+
+logger = logging.getLogger(__name__)
+
+
+class Burst:
+    """Сообщения пользователя, пришедшие подряд; агент отвечает на них одним ходом"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.deliveries: list[AbstractIncomingMessage] = []
+        # Модель, вызвавшая инструменты, - для продолжения хода
+        self.follow_up_model: Optional[str] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class ChatConsumer:
+    """
+    Потребитель chat_queue. Событие "new" по пользователю не запускает
+    агента сразу: ход стартует, когда пользователь debounce секунд ничего
+    не присылает, но не позже max_wait от первого сообщения серии.
+    Событие "tool_result" (продолжение хода после инструментов) запускает
+    ход сразу. Ходы одного пользователя идут строго по очереди; сообщения
+    подтверждаются после успешного хода, а после ошибки возвращаются
+    в очередь, пока у пользователя не наберётся max_attempts неудач подряд.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        queue: str,
+        agent_id: int,
+        debounce: float,
+        max_wait: float,
+        prefetch: int,
+        concurrency: int,
+        max_attempts: int,
+    ):
+        self.url = url
+        self.queue = queue
+        self.agent_id = agent_id
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.prefetch = prefetch
+        self.max_attempts = max_attempts
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._bursts: dict[int, Burst] = {}
+        self._turns: dict[int, asyncio.Task] = {}
+        self._failures: dict[int, int] = {}
+
+    async def start(self):
+        try:
+            self._connection = await aio_pika.connect_robust(self.url, timeout=settings.RABBITMQ_CONNECT_TIMEOUT)
+            channel = await self._connection.channel()
+            await channel.set_qos(prefetch_count=self.prefetch)
+            queue = await channel.declare_queue(self.queue)
+            await queue.consume(self._on_message)
+        except Exception as e:
+            logger.warning("Chat consumer is not started, RabbitMQ is unavailable: %s", e)
+
+    async def stop(self):
+        for burst in self._bursts.values():
+            if burst.timer is not None:
+                burst.timer.cancel()
+        self._bursts.clear()
+        for task in list(self._turns.values()):
+            task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _on_message(self, delivery: AbstractIncomingMessage):
+        try:
+            payload = json.loads(delivery.body)
+        except ValueError:
+            payload = {}
+        # В ту же очередь пишут и уведомления - агенту нужны только события чата
+        if payload.get("message") not in ("new", "tool_result") or payload.get("chat_id") is None:
+            await delivery.ack()
+            return
+
+        user_id = int(payload["chat_id"])
+        burst = self._bursts.get(user_id)
+        if burst is None:
+            burst = self._bursts[user_id] = Burst()
+        burst.deliveries.append(delivery)
+
+        if burst.timer is not None:
+            burst.timer.cancel()
+        if payload["message"] == "tool_result":
+            burst.follow_up_model = payload.get("model")
+            delay = 0.0
+        else:
+            delay = min(self.debounce, max(0.0, burst.started + self.max_wait - time.monotonic()))
+        burst.timer = asyncio.get_running_loop().call_later(delay, self._fire, user_id)
+
+    def _fire(self, user_id: int):
+        burst = self._bursts.pop(user_id, None)
+        if burst is None:
+            return
+        previous = self._turns.get(user_id)
+        task = asyncio.create_task(self._run_turn(user_id, burst, previous))
+        self._turns[user_id] = task
+
+        def done(task: asyncio.Task):
+            if self._turns.get(user_id) is task:
+                del self._turns[user_id]
+
+        task.add_done_callback(done)
+
+    async def _run_turn(self, user_id: int, burst: Burst, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            # Следующий ход пользователя ждёт окончания предыдущего
+            await asyncio.gather(previous, return_exceptions=True)
+
+        metrics.observe("ai.burst_size", len(burst.deliveries))
+        try:
+            async with self._semaphore:
+                async with async_session_factory() as session:
+                    result = await AIHandler(session).process_agent_request(
+                        self.agent_id, user_id, burst.follow_up_model
+                    )
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+        except Exception:
+            metrics.inc("ai.turn_errors")
+            logger.exception("Agent turn failed for user %s", user_id)
+            failures = self._failures.get(user_id, 0) + 1
+            if failures < self.max_attempts:
+                self._failures[user_id] = failures
+                for delivery in burst.deliveries:
+                    await delivery.nack(requeue=True)
+                return
+            self._failures.pop(user_id, None)
+            metrics.inc("ai.turns_dropped")
+            logger.error("Dropping agent turn for user %s after %s failed attempts", user_id, failures)
+        else:
+            self._failures.pop(user_id, None)
+            metrics.inc("ai.turns")
+        for delivery in burst.deliveries:
+            await delivery.ack()
+
+
+chat_consumer = ChatConsumer(
+    url=settings.RABBITMQ_URL,
+    queue=settings.RABBITMQ_QUEUE,
+    agent_id=settings.AI_AGENT_ID,
+    debounce=settings.AI_DEBOUNCE_SECONDS,
+    max_wait=settings.AI_DEBOUNCE_MAX_WAIT,
+    prefetch=settings.AI_CONSUMER_PREFETCH,
+    concurrency=settings.ANTHROPIC_MAX_CONCURRENCY,
+    max_attempts=settings.AI_TURN_MAX_ATTEMPTS,
+)
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.worklog.config.config import settings
+from src.worklog.db.core import async_session_factory
+from src.worklog.metrics.service import metrics
+from .anthropic_client import anthropic_client
+from .models import AgentMessages, AgentConversationSummary
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM = (
+    "Ты ведёшь краткое содержание переписки ассистента с сотрудником. "
+    "Дополни текущее содержание новыми сообщениями: сохрани договорённости, "
+    "упомянутые задачи, отчёты и открытые вопросы, убери повторы и приветствия. "
+    "Ответь только новым содержанием, не длиннее нескольких абзацев."
+)
+
+
+def estimate_tokens(message: dict) -> int:
+    """Грубая оценка: около трёх символов на токен для русского текста"""
+    return len(json.dumps(message["content"], ensure_ascii=False)) // 3 + 4
+
+
+def message_from_row(msg: AgentMessages) -> Optional[dict]:
+    if msg.role == 'user':
+        if msg.tool_use:
+            return {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": msg.tool_id,
+                        "content": json.dumps(msg.tool_output, ensure_ascii=False)
+                    }
+                ]
+            }
+        return {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": msg.content
+                }
+            ]
+        }
+
+    if msg.role == 'assistant':
+        # Пустые текстовые блоки API не принимает: у параллельных вызовов текст только в первой строке
+        content = [{"type": "text", "text": msg.content}] if msg.content.strip() else []
+        if msg.tool_use:
+            content.append({
+                "type": "tool_use",
+                "name": msg.tool_name,
+                "id": msg.tool_id,
+                "input": msg.tool_input
+            })
+        if not content:
+            return None
+        return {
+            "role": "assistant",
+            "content": content
+        }
+    return None
+
+
+def _is_tool_result(msg: AgentMessages) -> bool:
+    return msg.role == 'user' and msg.tool_use
+
+
+def _is_tool_call(msg: AgentMessages) -> bool:
+    return msg.role == 'assistant' and msg.tool_use
+
+
+def _is_user_text(msg: AgentMessages) -> bool:
+    return msg.role == 'user' and not msg.tool_use
+
+
+def _group_turns(rows: list[AgentMessages]) -> list[list[AgentMessages]]:
+    """
+    Режет историю (по возрастанию) на неделимые куски: вызовы инструментов
+    одного хода всегда идут вместе со своими результатами, иначе API отклонит запрос.
+    Результат встаёт к своему вызову, даже если между ними записалось сообщение
+    пользователя; вызовы без результата и результаты без вызова отбрасываются.
+    """
+    turns = []
+    calls: dict[str, list[AgentMessages]] = {}
+    for row in rows:
+        if _is_tool_result(row):
+            if row.tool_id in calls:
+                calls[row.tool_id].append(row)
+        elif turns and _is_tool_call(row) and _is_tool_call(turns[-1][-1]):
+            turns[-1].append(row)
+            calls[row.tool_id] = turns[-1]
+        else:
+            turns.append([row])
+            if _is_tool_call(row):
+                calls[row.tool_id] = turns[-1]
+
+    answered = {row.tool_id for row in rows if _is_tool_result(row)}
+    turns = [[row for row in turn if not _is_tool_call(row) or row.tool_id in answered] for turn in turns]
+    return [turn for turn in turns if turn]
+
+
+def _block_kind(message: dict) -> str:
+    kinds = {block["type"] for block in message["content"]}
+    return "tool_result" if kinds == {"tool_result"} else "text" if kinds == {"text"} else "mixed"
+
+
+def merge_consecutive(messages: list[dict]) -> list[dict]:
+    """
+    Склеивает подряд идущие сообщения одной роли в один ход: серию коротких
+    сообщений пользователя, параллельные вызовы инструментов и их результаты.
+    """
+    merged = []
+    for message in messages:
+        previous = merged[-1] if merged else None
+        if previous and previous["role"] == message["role"] and (
+            message["role"] == "assistant" or _block_kind(previous) == _block_kind(message) != "mixed"
+        ):
+            previous["content"] = previous["content"] + message["content"]
+        else:
+            merged.append({"role": message["role"], "content": list(message["content"])})
+    return merged
+
+
+class ConversationContext:
+    def __init__(self, summary: Optional[str], messages: list[dict], tokens: int):
+        self.summary = summary
+        self.messages = messages
+        self.tokens = tokens
+
+
+class ContextBuilder:
+    """
+    Собирает историю диалога в пределах бюджета токенов: с конца, пачками,
+    пока бюджет не исчерпан. Всё, что старше окна, сворачивается в хранимое
+    краткое содержание; сворачивание идёт в фоне и только по новым сообщениям.
+    """
+
+    _folding: set[int] = set()
+    _tasks: set[asyncio.Task] = set()
+
+    def __init__(self, db: AsyncSession, max_tokens: int = None, fetch_batch: int = None):
+        self.db = db
+        self.max_tokens = max_tokens or settings.AI_CONTEXT_MAX_TOKENS
+        self.fetch_batch = fetch_batch or settings.AI_CONTEXT_FETCH_BATCH
+
+    async def build(self, user_id: int) -> ConversationContext:
+        summary_db = await self.db.execute(
+            select(AgentConversationSummary).where(AgentConversationSummary.user_id == user_id)
+        )
+        summary = summary_db.scalars().first()
+        summarized_up_to = summary.last_message_id if summary else 0
+
+        # Строки читаются с конца, пока их заведомо хватает на бюджет и среди них
+        # есть обычное сообщение пользователя, с которого начнётся окно
+        rows: list[AgentMessages] = []
+        raw_tokens = 0
+        overflow = False
+        has_user_text = False
+        while True:
+            query = (
+                select(AgentMessages)
+                .where(AgentMessages.user_id == user_id, AgentMessages.id > summarized_up_to)
+                .order_by(AgentMessages.id.desc())
+                .limit(self.fetch_batch)
+            )
+            if rows:
+                query = query.where(AgentMessages.id < rows[-1].id)
+            batch = (await self.db.execute(query)).scalars().all()
+            for row in batch:
+                message = message_from_row(row)
+                raw_tokens += estimate_tokens(message) if message else 0
+                has_user_text = has_user_text or _is_user_text(row)
+            rows.extend(batch)
+            if len(batch) < self.fetch_batch:
+                break
+            if raw_tokens > self.max_tokens:
+                overflow = True
+                if has_user_text:
+                    break
+        rows.reverse()
+
+        # Последний ход пользователя со всеми вызовами берётся всегда, дальше -
+        # целые куски с конца, пока помещаются
+        turns = _group_turns(rows)
+        start = next((index for index in range(len(turns) - 1, -1, -1) if _is_user_text(turns[index][0])), 0)
+        kept: list[list[AgentMessages]] = []
+        tokens = 0
+        for index in range(len(turns) - 1, -1, -1):
+            turn = turns[index]
+            turn_messages = [message for message in map(message_from_row, turn) if message]
+            turn_tokens = sum(estimate_tokens(message) for message in turn_messages)
+            if index < start and tokens + turn_tokens > self.max_tokens:
+                overflow = True
+                break
+            kept.append(turn)
+            tokens += turn_tokens
+        kept.reverse()
+
+        # Диалог должен начинаться с обычного сообщения пользователя
+        while kept and not _is_user_text(kept[0][0]):
+            kept.pop(0)
+
+        if overflow:
+            self._schedule_fold(user_id, self._fold_boundary(kept))
+
+        messages = merge_consecutive([message for turn in kept for message in map(message_from_row, turn) if message])
+        metrics.observe("ai.context_tokens", tokens)
+        return ConversationContext(summary.summary if summary else None, messages, tokens)
+
+    def _fold_boundary(self, kept: list[list[AgentMessages]]) -> int:
+        """
+        До какого id сворачивать. Сворачивается и старшая половина окна,
+        чтобы следующее сворачивание понадобилось не на каждом ходу. Граница
+        ставится перед обычным сообщением пользователя: так несвёрнутый
+        остаток тоже начинается с него.
+        """
+        budget = self.max_tokens // 2
+        tokens = 0
+        boundary = kept[0][0].id - 1 if kept else 0
+        for turn in reversed(kept):
+            tokens += sum(estimate_tokens(message) for message in map(message_from_row, turn) if message)
+            if tokens > budget and _is_user_text(turn[0]):
+                boundary = turn[0].id - 1
+                break
+        return boundary
+
+    def _schedule_fold(self, user_id: int, up_to_id: int):
+        if user_id in self._folding or up_to_id <= 0:
+            return
+        self._folding.add(user_id)
+        task = asyncio.create_task(fold_summary(user_id, up_to_id))
+        self._tasks.add(task)
+
+        def done(task: asyncio.Task):
+            self._tasks.discard(task)
+            self._folding.discard(user_id)
+
+        task.add_done_callback(done)
+
+
+def _render_for_summary(row: AgentMessages) -> str:
+    if row.tool_use and row.role == 'user':
+        output = json.dumps(row.tool_output, ensure_ascii=False)
+        return f"[результат {row.tool_name}]: {output[:settings.AI_SUMMARY_TOOL_OUTPUT_CHARS]}"
+    if row.tool_use:
+        return f"ассистент вызвал {row.tool_name}: {json.dumps(row.tool_input, ensure_ascii=False)}"
+    author = "сотрудник" if row.role == 'user' else "ассистент"
+    return f"{author}: {row.content}"
+
+
+async def fold_summary(user_id: int, up_to_id: int):
+    """Дополняет краткое содержание сообщениями из (last_message_id, up_to_id]"""
+    try:
+        async with async_session_factory() as session:
+            summary_db = await session.execute(
+                select(AgentConversationSummary).where(AgentConversationSummary.user_id == user_id)
+            )
+            summary = summary_db.scalars().first()
+            last_message_id = summary.last_message_id if summary else 0
+            text = summary.summary if summary else ""
+
+            while last_message_id < up_to_id:
+                rows = (await session.execute(
+                    select(AgentMessages)
+                    .where(
+                        AgentMessages.user_id == user_id,
+                        AgentMessages.id > last_message_id,
+                        AgentMessages.id <= up_to_id,
+                    )
+                    .order_by(AgentMessages.id)
+                    .limit(settings.AI_SUMMARY_BATCH)
+                )).scalars().all()
+                if not rows:
+                    break
+
+                transcript = "\n".join(_render_for_summary(row) for row in rows)
+                response = await anthropic_client.create_message(
+                    model=settings.AI_SUMMARY_MODEL,
+                    max_tokens=settings.AI_SUMMARY_MAX_TOKENS,
+                    system=SUMMARY_SYSTEM,
+                    messages=[{
+                        "role": "user",
+                        "content": f"Текущее содержание:\n{text or '(пусто)'}\n\nНовые сообщения:\n{transcript}",
+                    }],
+                )
+                text = "".join(block.text for block in response.content if block.type == 'text').strip()
+                last_message_id = rows[-1].id
+
+                upsert = pg_insert(AgentConversationSummary).values(
+                    user_id=user_id, summary=text, last_message_id=last_message_id
+                )
+                await session.execute(upsert.on_conflict_do_update(
+                    index_elements=[AgentConversationSummary.user_id],
+                    set_={"summary": upsert.excluded.summary, "last_message_id": upsert.excluded.last_message_id},
+                ))
+                await session.commit()
+                metrics.inc("ai.summary_folds")
+    except Exception:
+        logger.exception("Failed to fold conversation summary for user %s", user_id)
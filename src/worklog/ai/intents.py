@@ -0,0 +1,174 @@
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.worklog.metrics.service import metrics
+from src.worklog.reshift.schemas import ReshiftCreate
+from src.worklog.reshift.service import ReShiftService
+from src.worklog.tasks.models import TaskAssignees
+from src.worklog.tasks.schemas import UpdateTaskStatusByAI
+from src.worklog.tasks.service import TaskService
+from .models import AgentMessages
+
+logger = logging.getLogger(__name__)
+
+# Буквы, которых нет в русском алфавите, и слова команд на казахском
+KAZAKH = re.compile(r"[әғқңөұүһі]|тапсырма|орында|есеп|жоспар|дайын|бітті")
+
+MY_TASKS = [
+    re.compile(r"(покажи|показать|выведи|дай|какие|список)?\s*(все\s+)?(мои|моих|у меня)?\s*(активные\s+)?"
+               r"(задачи|задач|таски)(\s+у меня)?(\s+на сегодня)?"),
+    re.compile(r"(менің\s+)?тапсырмалар(ым|ымды)?(\s+(көрсет|қандай))?"),
+]
+
+# Меняют статус задачи, поэтому требуют глагола или слова "задача"/"тапсырма":
+# голое "5 готова" уходит модели
+TASK_DONE = [
+    re.compile(r"(я\s+)?(выполнил|выполнила|сделал|сделала|закончил|закончила)\s+задачу\s*(№|#|номер)?\s*(?P<id>\d+)"),
+    re.compile(r"(задача|задачу)\s*(№|#|номер)?\s*(?P<id>\d+)\s+(выполнена|готова|сделана|закрыта|завершена)"),
+    re.compile(r"(закрой|закрыть|отметь|отметить|заверши|завершить)\s+задачу\s*(№|#|номер)?\s*(?P<id>\d+)"
+               r"(\s+(как\s+)?(выполненной|выполненную|готовой|сделанной))?"),
+    re.compile(r"(тапсырма|тапсырманы)\s*(№|#)?\s*(?P<id>\d+)\s*(орындалды|орындадым|дайын|бітті|аяқталды)"),
+    re.compile(r"(№|#)?\s*(?P<id>\d+)\s*(тапсырма|тапсырманы)\s*(орындалды|орындадым|дайын|бітті|аяқталды)"),
+]
+
+# Вопрос ("задача 3 готова?", "дайын ба") - не команда, его разбирает модель
+QUESTION = re.compile(r"\?|(?<!\w)(ли|ма|ме|ба|бе|па|пе)(?!\w)", re.IGNORECASE)
+
+# Отчёт сдаёт смену: задачи пользователя передаются сменщику. Поэтому быстрый
+# путь срабатывает только на явный префикс "отчёт:" / "есеп:" в начале сообщения
+SHIFT_REPORT = re.compile(
+    r"^\s*(отч[её]т(\s+по\s+смене)?|есеп)\s*:\s*"
+    r"(сделано|выполнено|істелді|орындалды)\s*:\s*(?P<done>.+?)\s*"
+    r"(план|сделать|надо сделать|осталось|жоспар)\s*:\s*(?P<todo>.+?)\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+STATUS_NAMES = {
+    "new": ("новая", "жаңа"),
+    "in_progress": ("в работе", "орындалуда"),
+    "testing": ("на проверке", "тексеруде"),
+    "done": ("выполнена", "орындалды"),
+}
+
+REPLIES = {
+    "no_tasks": ("У вас нет активных задач.", "Сізде белсенді тапсырма жоқ."),
+    "tasks": ("Ваши задачи:", "Сіздің тапсырмаларыңыз:"),
+    "task_done": ("Задача №{id} «{title}» отмечена как выполненная.", "№{id} «{title}» тапсырмасы орындалды деп белгіленді."),
+    "task_not_found": ("Задача №{id} не найдена среди ваших задач.", "№{id} тапсырма сіздің тапсырмаларыңыздың арасында жоқ."),
+    "report": ("Отчёт по смене сохранён, задачи переданы сменщику.", "Ауысым есебі сақталды, тапсырмалар ауысымшыға берілді."),
+}
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("ё", "е")
+    text = re.sub(r"[^\w\s№#]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class IntentMatch:
+    def __init__(self, intent: str, lang: int, params: dict):
+        self.intent = intent
+        # 0 - русский, 1 - казахский; индекс в REPLIES и STATUS_NAMES
+        self.lang = lang
+        self.params = params
+
+
+def match_intent(text: str) -> Optional[IntentMatch]:
+    """
+    Распознаёт несколько типовых команд. Шаблоны должны покрывать
+    сообщение целиком: всё, что сказано сверх команды, уходит модели.
+    """
+    lang = 1 if KAZAKH.search(text.lower()) else 0
+
+    report = SHIFT_REPORT.match(text)
+    if report:
+        return IntentMatch("shift_report", lang, {"done": report.group("done"), "todo": report.group("todo")})
+
+    normalized = _normalize(text)
+    if any(pattern.fullmatch(normalized) for pattern in MY_TASKS):
+        return IntentMatch("my_tasks", lang, {})
+    # Просмотр задач безопасен и в форме вопроса, смена статуса - нет
+    if QUESTION.search(text):
+        return None
+    for pattern in TASK_DONE:
+        match = pattern.fullmatch(normalized)
+        if match:
+            return IntentMatch("task_done", lang, {"task_id": int(match.group("id"))})
+    return None
+
+
+class IntentRouter:
+    """Быстрый путь перед моделью: типовые команды выполняются сразу по БД"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _pending_text(self, user_id: int) -> Optional[str]:
+        """Текст сообщений пользователя после последнего ответа ассистента"""
+        rows = (await self.db.execute(
+            select(AgentMessages)
+            .where(AgentMessages.user_id == user_id)
+            .order_by(AgentMessages.id.desc())
+            .limit(10)
+        )).scalars().all()
+        texts = []
+        for row in rows:
+            if row.role != 'user':
+                break
+            # После результатов инструментов ход продолжает модель
+            if row.tool_use:
+                return None
+            texts.append(row.content)
+        if not texts:
+            return None
+        return "\n".join(reversed(texts)).strip()
+
+    async def try_answer(self, user_id: int) -> Optional[str]:
+        text = await self._pending_text(user_id)
+        match = match_intent(text) if text else None
+        if match is None:
+            metrics.inc("ai.intents", intent="none")
+            return None
+
+        try:
+            reply = await getattr(self, f"_{match.intent}")(user_id, match)
+        except Exception:
+            # Сервисы не всегда откатывают сессию сами, а дальше по ней пойдёт модель
+            await self.db.rollback()
+            logger.exception("Intent %s failed, falling back to the model", match.intent)
+            metrics.inc("ai.intents", intent=match.intent, result="error")
+            return None
+        metrics.inc("ai.intents", intent=match.intent, result="answered")
+        return reply
+
+    async def _my_tasks(self, user_id: int, match: IntentMatch) -> str:
+        result = await TaskService(self.db).get_all_my_tasks_by_ai(user_id)
+        tasks = [task for task in result.tasks if task.status != "done"]
+        if not tasks:
+            return REPLIES["no_tasks"][match.lang]
+        lines = [REPLIES["tasks"][match.lang]]
+        for number, task in enumerate(tasks, start=1):
+            status = STATUS_NAMES.get(task.status, (task.status, task.status))[match.lang]
+            lines.append(f"{number}. №{task.id} {task.title} - {status}")
+        return "\n".join(lines)
+
+    async def _task_done(self, user_id: int, match: IntentMatch) -> str:
+        task_id = match.params["task_id"]
+        assigned = await self.db.execute(
+            select(TaskAssignees.id).where(TaskAssignees.task_id == task_id, TaskAssignees.user_id == user_id)
+        )
+        if assigned.first() is None:
+            return REPLIES["task_not_found"][match.lang].format(id=task_id)
+        task = await TaskService(self.db).task_change_status_by_ai(UpdateTaskStatusByAI(task_id=task_id, status="done"))
+        return REPLIES["task_done"][match.lang].format(id=task.id, title=task.title)
+
+    async def _shift_report(self, user_id: int, match: IntentMatch) -> str:
+        """Сохраняет отчёт и, как и инструмент модели, передаёт задачи пользователя сменщику"""
+        await ReShiftService(self.db).create_report_reshift(
+            ReshiftCreate(user_id=user_id, done=match.params["done"], todo=match.params["todo"])
+        )
+        return REPLIES["report"][match.lang]
@@ -1,6 +1,6 @@
 from src.worklog.db.core import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Boolean, DateTime, func, Text, JSON, Enum as SQLAlchemyEnum
+from sqlalchemy import String, Integer, Boolean, DateTime, func, Text, JSON, Index, Enum as SQLAlchemyEnum
 from datetime import datetime
 from enum import Enum
 
@@ -68,8 +68,24 @@ class AgentToolsData(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
+class AgentConversationSummary(Base):
+    """Краткое содержание истории диалога до last_message_id включительно"""
+    __tablename__ = 'agent_conversation_summaries'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, unique=True)
+    summary: Mapped[str] = mapped_column(Text, nullable=False)
+    last_message_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
 class AgentMessages(Base):
     __tablename__ = 'agent_messages'
+    __table_args__ = (
+        Index('ix_agent_messages_user_id_created_at', 'user_id', 'created_at'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
@@ -85,6 +101,28 @@ class AgentMessages(Base):
     tool_id: Mapped[str] = mapped_column(String(255), nullable=True) # ID инструмента
     tool_input: Mapped[dict] = mapped_column(JSON, nullable=True) # Входные данные инструмента
     tool_output: Mapped[dict] = mapped_column(JSON, nullable=True) # Выходные данные инструмента
+    external_id: Mapped[str] = mapped_column(String(255), nullable=True, unique=True) # ID сообщения в шлюзе, для дедупликации
 
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class WebhookInbox(Base):
+    """Сырые пачки вебхука шлюза: пишутся сразу, разбираются фоновым обработчиком"""
+    __tablename__ = 'webhook_inbox'
+    __table_args__ = (
+        Index('ix_webhook_inbox_status_locked_until', 'status', 'locked_until'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    # pending -> processing -> stored -> done | failed; stored - сообщения сохранены, событие агенту ещё не ушло
+    status: Mapped[str] = mapped_column(String(20), nullable=False, server_default='pending')
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default='0')
+    locked_until: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    processed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
@@ -0,0 +1,71 @@
+import re
+
+from src.worklog.config.config import settings
+from src.worklog.metrics.service import metrics
+from .models import Model
+
+# Слова, после которых модель почти наверняка будет вызывать инструменты на запись
+TOOL_HINTS = re.compile(
+    r"созда|добав|назнач|измени|поменя|перенес|отч[её]т|удали|"
+    r"закр|отмет|выполн|заверш|законч|сделал|готов|статус|"
+    r"құр|қос|өзгерт|есеп|жаса|орында|аяқта|бітт|дайын",
+    re.IGNORECASE,
+)
+
+
+class RouteDecision:
+    def __init__(self, model: str, max_tokens: int, reason: str):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.reason = reason
+
+
+def _last_user_text(messages: list[dict]) -> tuple[str, bool]:
+    """Текст последнего хода пользователя и признак, что это результаты инструментов"""
+    if not messages or messages[-1]["role"] != "user":
+        return "", False
+    blocks = messages[-1]["content"]
+    if any(block["type"] == "tool_result" for block in blocks):
+        return "", True
+    return "\n".join(block.get("text", "") for block in blocks), False
+
+
+def route_model(
+    agent_model: str,
+    messages: list[dict],
+    context_tokens: int,
+    follow_up_model: str = None,
+) -> RouteDecision:
+    """
+    Выбирает модель на ход. Агент с моделью haiku всегда идёт в быструю модель;
+    агенту с sonnet быстрая достаётся, когда ход простой: короткое сообщение
+    без просьбы что-то изменить, неглубокий диалог и небольшой контекст.
+    Ответ по результатам инструментов продолжает та модель, что вызвала
+    инструменты (follow_up_model), чтобы цепочка записей не сменила модель посередине.
+    """
+    fast = RouteDecision(settings.AI_FAST_MODEL, settings.AI_FAST_MAX_TOKENS, "simple")
+    strong = RouteDecision(settings.ANTHROPIC_MODEL, settings.ANTHROPIC_MAX_TOKENS, "complex")
+
+    if agent_model == Model.claude_3_5_haiku.value:
+        decision = RouteDecision(fast.model, fast.max_tokens, "agent")
+    elif not settings.AI_ROUTING_ENABLED:
+        decision = RouteDecision(strong.model, strong.max_tokens, "agent")
+    else:
+        text, follow_up = _last_user_text(messages)
+        if context_tokens > settings.AI_ROUTE_MAX_CONTEXT_TOKENS:
+            decision = RouteDecision(strong.model, strong.max_tokens, "long_context")
+        elif len(messages) > settings.AI_ROUTE_MAX_DEPTH:
+            decision = RouteDecision(strong.model, strong.max_tokens, "deep_dialog")
+        elif follow_up:
+            # Модель неизвестна (событие без неё) - продолжает сильная
+            previous = fast if follow_up_model == fast.model else strong
+            decision = RouteDecision(previous.model, previous.max_tokens, "tool_follow_up")
+        elif len(text) > settings.AI_ROUTE_SHORT_CHARS:
+            decision = RouteDecision(strong.model, strong.max_tokens, "long_message")
+        elif TOOL_HINTS.search(text):
+            decision = RouteDecision(strong.model, strong.max_tokens, "write_tools")
+        else:
+            decision = fast
+
+    metrics.inc("ai.route", model=decision.model, reason=decision.reason)
+    return decision
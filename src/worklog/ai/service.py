@@ -1,5 +1,3 @@
-import json
-
 from src.worklog.ai.models import *
 from src.worklog.ai.schemas import *
 from src.worklog.ai.webhook_schema import *
@@ -7,20 +5,27 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert, select
 from fastapi import HTTPException
 from src.worklog.auth.models import Users
-from src.worklog.queue.service import RabbitMQPublisher
+from src.worklog.queue.service import publisher
+from src.worklog.ai.context import ContextBuilder
+from src.worklog.ai.agents import agent_cache
+from src.worklog.ai.webhook_consumer import chat_users, recent_message_ids, webhook_consumer
 
 class AIService:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.rabbitmq_publisher = RabbitMQPublisher()
+        self.rabbitmq_publisher = publisher
 
     async def _create_user_connection(self, user_id: int, chat_id: str) -> dict:
         user = await self.db.execute(select(Users).where(Users.id == user_id))
         user = user.scalars().first()
         if user:
+            previous_chat_id = user.chat_id_whatsapp
             user.chat_id_whatsapp = chat_id
             self.db.add(user)
             await self.db.commit()
+            chat_users.invalidate(chat_id)
+            if previous_chat_id:
+                chat_users.invalidate(previous_chat_id)
             return {"message": "User connection created successfully"}
         else:
             return {"message": "User not found"}
@@ -105,6 +110,7 @@ class AIService:
 
         self.db.add(result)
         await self.db.commit()
+        agent_cache.invalidate(agent_id)
         return {"message": "AI agent updated successfully"}
     
     async def create_agent_tools(self, agent_id: int, agent_tools: CreateAgentTools) -> dict:
@@ -123,6 +129,7 @@ class AIService:
         )
         self.db.add(new_agent_tools)
         await self.db.commit()
+        agent_cache.invalidate(agent_id)
         return {"message": "Agent tools created successfully"}
     
     async def update_agent_tools(self, agent_id: int, agent_tools: CreateAgentTools) -> dict:
@@ -137,6 +144,7 @@ class AIService:
             
         self.db.add(result)
         await self.db.commit()
+        agent_cache.invalidate(agent_id)
         return {"message": "Agent tools updated successfully"}
     
     async def delete_agent_tools(self, agent_tools_id: int) -> dict:
@@ -146,89 +154,25 @@ class AIService:
             return {"message": "Agent tools not found"}
         await self.db.delete(result)
         await self.db.commit()
+        agent_cache.invalidate(result.agent_id)
         return {"message": "Agent tools deleted successfully"}
     
     async def get_agent_tools(self, agent_id: int) -> dict:
-        # Default tools that are always available
-        tools = []
-        
-        # Get tools from database
-        tools_db = await self.db.execute(select(AgentToolsData).where(AgentToolsData.agent_id == agent_id))
-        result = tools_db.scalars().all()
-        
-        if not result:
-            return {"tools": tools}
-        
-        # Add database tools to the list
-        for tool in result:
-            tools.append(
-                {
-                    "type": "custom",
-                    "name": f"{tool.tool_name}",
-                    "description": f"{tool.tool_type.value} tool with {tool.tool_method.value} method",
-                    "input_schema": {
-                        "type": "object",
-                        "properties": {
-                            **tool.tool_properties
-                        },
-                        "required": tool.tool_required
-                    }
-                }
-            )
-        
-        return {"tools": tools}
+        compiled = await agent_cache.get(self.db, agent_id)
+        return {"tools": compiled.tools if compiled else []}
         
     async def webhook(self, payload: WebhookPayload) -> dict:
-        message_to_insert = []
-        save = False
-        for message in payload.messages:
-            chat_id = await self._get_user_connection_by_chat_id(message.chat_id)
-            content = ""
-            if message.text:
-                content = message.text.body
-            elif message.document:
-                content = message.document.caption or message.document.file_name
-            elif message.voice:
-                content = f"Voice message ({message.voice.seconds}s)"
-            elif message.sticker:
-                content = "Sticker"
-            elif message.link_preview:
-                content = message.link_preview.body
-            elif message.action:
-                content = f"Action: {message.action.type}"
-            
-            message_record = {
-                "agent_id": 1,
-                "user_id": chat_id,
-                "content": content,
-                "type_message": "text",
-                "role": "assistant" if message.from_me else "user",
-                "tool_use": False,
-                "tool_name": None,
-                "tool_id": None,
-                "tool_input": None,
-                "tool_output": None,
-            }
-            if message.from_me:
-                save = False
-            else:
-                save = True
-            message_to_insert.append(message_record)
-            
-        if message_to_insert:
-            if save:
-                await self.db.execute(
-                    insert(AgentMessages),
-                    message_to_insert
-                )
-                await self.db.commit()  
-
-                self.rabbitmq_publisher.send({
-                    "chat_id": chat_id,
-                    "message": "new"
-                })
-
-
+        """Сохраняет пачку как есть и сразу отвечает; разбирает её webhook_consumer"""
+        # Повторную доставку недавно принятых сообщений не пишем вовсе
+        messages = [message for message in payload.messages if message.id not in recent_message_ids]
+        if not messages:
+            return {"message": "Webhook received successfully"}
+
+        payload = payload.model_copy(update={"messages": messages})
+        self.db.add(WebhookInbox(payload=payload.model_dump(mode="json", by_alias=True)))
+        await self.db.commit()
+        recent_message_ids.add(message.id for message in messages)
+        webhook_consumer.wake()
         return {"message": "Webhook received successfully"}
     
     async def _set_agent(self, agent_id: int, user_id: int) -> dict:
@@ -242,104 +186,25 @@ class AIService:
         
         user_data = f'USER ID: {user.id}, Имя: {user.first_name}, Фамилия: {user.last_name}, Телефон: {user.phone}, Должность: {user.position}, Сегодня: {datetime.today()}'
         
-        # Get agent data
-        agent_db = await self.db.execute(select(AIAgent).where(AIAgent.id == agent_id))
-        agent = agent_db.scalars().first()
+        # Get agent data: промпт и инструменты из кэша воркера
+        agent = await agent_cache.get(self.db, agent_id)
         if not agent:
             return {"error": "Agent not found"}
         
-        # Get system message
-        system_message = f'Ваш зовут: {agent.name} \n\n {agent.system_message} \n\n {user_data}'
-        
-        # Get messages
-        messages = []
-        messages_db = await self.db.execute(
-            select(AgentMessages)
-            .where(AgentMessages.user_id == user_id)
-            .order_by(AgentMessages.created_at)
-        )
-        messages_result = messages_db.scalars().all()
-        
-        for msg in messages_result:
-            message_content = []
+        # История в пределах бюджета токенов, более старое - в кратком содержании
+        context = await ContextBuilder(self.db).build(user_id)
+        dynamic_system = user_data
+        if context.summary:
+            dynamic_system += f'\n\nКраткое содержание предыдущей переписки:\n{context.summary}'
+        system_message = agent.system(dynamic_system)
+        messages = context.messages
 
-            if msg.role == 'user':
-                if msg.tool_use:
-                    msg_new = {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": msg.tool_id,
-                                "content": json.dumps(msg.tool_output, ensure_ascii=False)
-                            }
-                        ]
-                    }
-                else:
-                    msg_new = {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": msg.content
-                            }
-                        ]
-                    }
-                messages.append(msg_new)
+        tools = agent.tools
 
-            if msg.role == 'assistant':
-                if msg.tool_use:
-                    msg_new = {
-                        "role": "assistant",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": msg.content,
-                            },
-                            {
-                                "type": "tool_use",
-                                "name": msg.tool_name,
-                                "id": msg.tool_id,
-                                "input": msg.tool_input
-                            }
-                        ]
-                    }
-                else:
-                    msg_new = {
-                        "role": "assistant",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": msg.content
-                            }
-                        ]
-                    }
-                messages.append(msg_new)
-
-
-        # Get tools
-        tools = []
-        tools_db = await self.db.execute(select(AgentToolsData).where(AgentToolsData.agent_id == agent_id))
-        tools_result = tools_db.scalars().all()
-        
-        for tool in tools_result:
-            tools.append(
-                {
-                    "type": "custom",
-                    "name": f"{tool.tool_name}",
-                    "description": f"{tool.tool_type.value} tool with {tool.tool_method.value} method",
-                    "input_schema": {
-                        "type": "object",
-                        "properties": {
-                            **tool.tool_properties
-                        },
-                        "required": tool.tool_required
-                    }
-                }
-            )
-        
         return {
             "system_message": system_message,
             "messages": messages,
-            "tools": tools
+            "tools": tools,
+            "agent_model": agent.model,
+            "context_tokens": context.tokens,
         }
\ No newline at end of file
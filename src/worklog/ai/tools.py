@@ -0,0 +1,109 @@
+import time
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.worklog.config.config import settings
+from src.worklog.metrics.service import metrics
+from src.worklog.reshift.schemas import ReshiftCreate
+from src.worklog.reshift.service import ReShiftService
+from src.worklog.tasks.schemas import CreateTaskByAI, GetUserTask, UpdateTaskStatusByAI
+from src.worklog.tasks.service import TaskService
+from .models import AgentToolsData
+
+
+class LocalTool:
+    """Инструмент агента, который выполняется вызовом сервиса в текущей сессии"""
+
+    def __init__(self, name: str, schema: type[BaseModel], handler: Callable[[AsyncSession, Any], Awaitable[Any]]):
+        self.name = name
+        self.schema = schema
+        self.handler = handler
+
+    async def run(self, db: AsyncSession, tool_input: dict):
+        data = self.schema.model_validate(tool_input or {})
+        return jsonable_encoder(await self.handler(db, data))
+
+
+class ToolRegistry:
+    """
+    Инструменты агентов. В AgentToolsData хранится URL; если он указывает
+    на наш собственный эндпоинт, вместо HTTP-запроса к себе же вызывается
+    сервис напрямую. Внешние инструменты идут через общий HTTP-клиент.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._by_name: dict[str, LocalTool] = {}
+        self._by_path: dict[str, LocalTool] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def register(self, name: str, path: str, schema: type[BaseModel], handler):
+        tool = LocalTool(name, schema, handler)
+        self._by_name[name] = tool
+        self._by_path[path.rstrip('/')] = tool
+
+    def resolve(self, tool: AgentToolsData) -> Optional[LocalTool]:
+        local = self._by_name.get(tool.tool_name)
+        if local is None and tool.tool_url:
+            local = self._by_path.get(urlparse(tool.tool_url).path.rstrip('/'))
+        return local
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        return self._http
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def execute(self, db: AsyncSession, tool: AgentToolsData, tool_input: dict):
+        local = self.resolve(tool)
+        started = time.perf_counter()
+        kind = "local" if local else "http"
+        try:
+            if local:
+                return await local.run(db, tool_input)
+            return await self._execute_http(tool, tool_input)
+        finally:
+            metrics.observe("ai.tool_seconds", time.perf_counter() - started, tool=tool.tool_name, kind=kind)
+
+    async def _execute_http(self, tool: AgentToolsData, tool_input: dict):
+        method = tool.tool_method.value.lower()
+        headers = tool.tool_headers or {}
+        if method in ('get', 'delete'):
+            response = await self.http.request(method, tool.tool_url, headers=headers, params=tool_input)
+        elif method in ('post', 'put'):
+            response = await self.http.request(method, tool.tool_url, headers=headers, json=tool_input)
+        else:
+            raise ValueError(f"Unsupported method: {method}")
+        if response.headers.get('content-type', '').startswith('application/json'):
+            return response.json()
+        return response.text
+
+
+tool_registry = ToolRegistry(timeout=settings.AI_TOOL_HTTP_TIMEOUT)
+
+tool_registry.register(
+    "get_all_my_tasks_by_ai", "/api/v1/tasks/task/ai/by/get/user/", GetUserTask,
+    lambda db, data: TaskService(db).get_all_my_tasks_by_ai(int(data.user_id)),
+)
+tool_registry.register(
+    "create_new_task_and_assign_me_by_ai", "/api/v1/tasks/task/ai/by/new/task", CreateTaskByAI,
+    lambda db, data: TaskService(db).create_new_task_and_assign_me_by_ai(data),
+)
+tool_registry.register(
+    "task_change_status_by_ai", "/api/v1/tasks/task/ai/by/update/task", UpdateTaskStatusByAI,
+    lambda db, data: TaskService(db).task_change_status_by_ai(data),
+)
+tool_registry.register(
+    "create_report_reshift", "/api/v1/reshifts/new/report/by/ai", ReshiftCreate,
+    lambda db, data: ReShiftService(db).create_report_reshift(data),
+)
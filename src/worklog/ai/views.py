@@ -5,7 +5,6 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.worklog.ai.schemas import *
 from .webhook_schema import *
 from .ai_handler import AIHandler
-from .whatsapp_handler import WhatsappHandler
 from src.worklog.config.auth import auth
 
 
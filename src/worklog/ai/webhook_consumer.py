@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.worklog.auth.models import Users
+from src.worklog.config.config import settings
+from src.worklog.db.core import async_session_factory
+from src.worklog.metrics.service import metrics
+from src.worklog.queue.service import publisher
+from .models import AgentMessages, WebhookInbox
+from .webhook_schema import Message, WebhookPayload
+
+logger = logging.getLogger(__name__)
+
+
+def message_content(message: Message) -> str:
+    if message.text:
+        return message.text.body
+    if message.document:
+        return message.document.caption or message.document.file_name
+    if message.voice:
+        return f"Voice message ({message.voice.seconds}s)"
+    if message.sticker:
+        return "Sticker"
+    if message.link_preview:
+        return message.link_preview.body
+    if message.action:
+        return f"Action: {message.action.type}"
+    return ""
+
+
+class RecentIds:
+    """Недавние id сообщений шлюза в памяти воркера: повторы отсекаются без обращения к БД"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, message_id: str) -> bool:
+        if message_id in self._ids:
+            self._ids.move_to_end(message_id)
+            return True
+        return False
+
+    def add(self, message_ids):
+        for message_id in message_ids:
+            self._ids[message_id] = None
+            self._ids.move_to_end(message_id)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+
+class ChatUserCache:
+    """chat_id WhatsApp -> id пользователя в памяти воркера; неизвестные чаты тоже кэшируются"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: dict[str, tuple[Optional[int], float]] = {}
+
+    def invalidate(self, chat_id: str):
+        self._entries.pop(chat_id, None)
+
+    def _store(self, chat_id: str, user_id: Optional[int], now: float):
+        if len(self._entries) >= self.max_size:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[chat_id] = (user_id, now)
+
+    async def resolve(self, db, chat_ids: set[str]) -> dict[str, Optional[int]]:
+        """Все промахи кэша добираются одним IN-запросом"""
+        now = time.monotonic()
+        resolved = {}
+        missing = []
+        for chat_id in chat_ids:
+            entry = self._entries.get(chat_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                resolved[chat_id] = entry[0]
+            else:
+                missing.append(chat_id)
+
+        metrics.inc("ai.chat_cache", len(resolved), result="hit")
+        if missing:
+            metrics.inc("ai.chat_cache", len(missing), result="miss")
+            result = await db.execute(
+                select(Users.chat_id_whatsapp, Users.id).where(Users.chat_id_whatsapp.in_(missing))
+            )
+            found = dict(result.all())
+            for chat_id in missing:
+                resolved[chat_id] = found.get(chat_id)
+                self._store(chat_id, resolved[chat_id], now)
+        return resolved
+
+
+class WebhookConsumer:
+    """
+    Разбор webhook_inbox в фоне. Эндпоинт вебхука только сохраняет пачку
+    и сразу отвечает шлюзу, поэтому тот не повторяет доставку из-за
+    медленного ответа. Строки забираются через FOR UPDATE SKIP LOCKED
+    с арендой, как в диспетчере уведомлений. Строка закрывается только
+    после публикации событий агенту; если брокер недоступен, она остаётся
+    в stored и публикация повторяется без повторного разбора.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        lease_seconds: float,
+        max_attempts: int,
+        chats: ChatUserCache,
+        recent_ids: RecentIds,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.chats = chats
+        self.recent_ids = recent_ids
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.process_once()
+            except Exception:
+                logger.exception("Webhook inbox processing failed")
+                claimed = 0
+
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, session) -> list:
+        claimable = (
+            select(WebhookInbox.id)
+            .where(or_(
+                WebhookInbox.status == "pending",
+                and_(
+                    WebhookInbox.status.in_(("processing", "stored")),
+                    or_(WebhookInbox.locked_until.is_(None), WebhookInbox.locked_until < func.now()),
+                ),
+            ))
+            .order_by(WebhookInbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claim = (
+            update(WebhookInbox)
+            .where(WebhookInbox.id.in_(claimable.scalar_subquery()))
+            .values(
+                status=case((WebhookInbox.status == "stored", "stored"), else_="processing"),
+                attempts=WebhookInbox.attempts + 1,
+                locked_until=func.now() + timedelta(seconds=self.lease_seconds),
+            )
+            .execution_options(synchronize_session=False)
+            .returning(WebhookInbox.id, WebhookInbox.payload, WebhookInbox.status)
+        )
+        rows = (await session.execute(claim)).all()
+        await session.commit()
+        return sorted(rows, key=lambda row: row.id)
+
+    async def process_once(self) -> int:
+        async with async_session_factory() as session:
+            rows = await self._claim(session)
+            if not rows:
+                return 0
+            ids = [row.id for row in rows]
+            try:
+                new_rows = [row for row in rows if row.status != "stored"]
+                user_ids = await self._process(session, new_rows) if new_rows else []
+                if new_rows:
+                    await session.execute(
+                        update(WebhookInbox)
+                        .where(WebhookInbox.id.in_([row.id for row in new_rows]))
+                        .values(status="stored")
+                        .execution_options(synchronize_session=False)
+                    )
+                    await session.commit()
+
+                # Сообщения уже сохранены раньше, не ушло только событие
+                stored_rows = [row for row in rows if row.status == "stored"]
+                if stored_rows:
+                    for user_id in await self._stored_users(session, stored_rows):
+                        if user_id not in user_ids:
+                            user_ids.append(user_id)
+
+                # Одно событие на пользователя, сколько бы сообщений он ни прислал
+                for user_id in user_ids:
+                    await publisher.send({
+                        "chat_id": user_id,
+                        "message": "new"
+                    })
+                await publisher.flush()
+
+                await session.execute(
+                    update(WebhookInbox)
+                    .where(WebhookInbox.id.in_(ids))
+                    .values(status="done", processed_at=func.now(), locked_until=None)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                await session.execute(
+                    update(WebhookInbox)
+                    .where(WebhookInbox.id.in_(ids))
+                    .values(
+                        status=case(
+                            (WebhookInbox.attempts >= self.max_attempts, "failed"),
+                            (WebhookInbox.status == "stored", "stored"),
+                            else_="pending",
+                        ),
+                        last_error=f"{type(e).__name__}: {e}"[:1000],
+                        locked_until=None,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+                raise
+        return len(rows)
+
+    async def _stored_users(self, session, rows: list) -> list[int]:
+        message_ids = [
+            message.id
+            for row in rows
+            for message in WebhookPayload.model_validate(row.payload).messages
+            if not message.from_me
+        ]
+        if not message_ids:
+            return []
+        result = await session.execute(
+            select(AgentMessages.user_id).where(AgentMessages.external_id.in_(message_ids)).distinct()
+        )
+        return list(result.scalars().all())
+
+    async def _process(self, session, rows: list) -> list[int]:
+        messages = {}
+        for row in rows:
+            for message in WebhookPayload.model_validate(row.payload).messages:
+                # Свои исходящие сообщения шлюз тоже присылает - их не сохраняем
+                if message.from_me:
+                    metrics.inc("webhook.skipped", reason="from_me")
+                    continue
+                if message.id in messages:
+                    metrics.inc("webhook.skipped", reason="duplicate")
+                    continue
+                messages[message.id] = message
+        messages = list(messages.values())
+        if not messages:
+            return []
+
+        users = await self.chats.resolve(session, {message.chat_id for message in messages})
+        records = []
+        for message in messages:
+            user_id = users.get(message.chat_id)
+            if user_id is None:
+                metrics.inc("webhook.skipped", reason="unknown_chat")
+                continue
+            records.append({
+                "agent_id": settings.AI_AGENT_ID,
+                "user_id": user_id,
+                "content": message_content(message),
+                "type_message": "text",
+                "role": "user",
+                "tool_use": False,
+                "tool_name": None,
+                "tool_id": None,
+                "tool_input": None,
+                "tool_output": None,
+                "external_id": message.id,
+            })
+        if not records:
+            return []
+
+        # Уже сохранённые id отсекает уникальный индекс; событие уходит только по новым строкам
+        inserted = (await session.execute(
+            pg_insert(AgentMessages)
+            .values(records)
+            .on_conflict_do_nothing(index_elements=[AgentMessages.external_id])
+            .returning(AgentMessages.user_id, AgentMessages.external_id)
+        )).all()
+        self.recent_ids.add(row.external_id for row in inserted)
+        metrics.inc("webhook.messages", len(inserted))
+        metrics.inc("webhook.skipped", len(records) - len(inserted), reason="duplicate")
+
+        user_ids = []
+        for row in inserted:
+            if row.user_id not in user_ids:
+                user_ids.append(row.user_id)
+        return user_ids
+
+
+recent_message_ids = RecentIds(max_size=settings.WEBHOOK_RECENT_IDS)
+
+chat_users = ChatUserCache(ttl=settings.AI_CHAT_CACHE_TTL, max_size=settings.AI_CHAT_CACHE_SIZE)
+
+webhook_consumer = WebhookConsumer(
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    poll_interval=settings.WEBHOOK_POLL_INTERVAL,
+    lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    chats=chat_users,
+    recent_ids=recent_message_ids,
+)
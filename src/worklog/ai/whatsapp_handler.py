@@ -1,23 +1,100 @@
+import json
+import time
+from typing import Optional
+
 import httpx
 
+from src.worklog.config.config import settings
+from src.worklog.metrics.service import metrics
+
+
 class WhatsappHandler:
-    def __init__(self):
-        self.token = 'N9WrSiPBZTcZ5gtimtFJ5VaRe6BklVWP'
-        self.url = 'https://gate.whapi.cloud/messages/text'
+    """
+    Клиент шлюза WhatsApp, один на воркер. httpx.AsyncClient с keep-alive
+    и HTTP/2 создаётся в lifespan приложения и переиспользуется всеми
+    сервисами; конструкторы сервисов сеть не трогают.
+    """
+
+    def __init__(self, url: str, token: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = url
         self.headers = {
             'accept': 'application/json',
-            'authorization': f'Bearer {self.token}',
+            'authorization': f'Bearer {token}',
             'Content-Type': 'application/json'
         }
-        
-    async def send_message(self, body: str, to: str):
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=settings.WHATSAPP_HTTP2,
+            headers=self.headers,
+            limits=httpx.Limits(
+                max_connections=settings.WHATSAPP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WHATSAPP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.WHATSAPP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.WHATSAPP_READ_TIMEOUT,
+                connect=settings.WHATSAPP_CONNECT_TIMEOUT,
+                pool=settings.WHATSAPP_POOL_TIMEOUT,
+            ),
+            transport=self.transport,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Вне приложения (скрипты, тесты) клиент создаётся при первом обращении
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        self.client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.started":
+            metrics.inc("whatsapp.connections_opened")
+
+    async def send_message(self, body: str, to: str, raise_for_status: bool = False):
         payload = {
             "typing_time": 0,
             "to": to,
             "body": body
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.url, headers=self.headers, json=payload)
+        metrics.inc("whatsapp.requests")
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.client.post(self.url, json=payload, extensions={"trace": self._trace})
+            status = response.status_code
+            if raise_for_status:
+                response.raise_for_status()
             return response.json()
-        
-        
+        finally:
+            metrics.observe("whatsapp.send_seconds", time.perf_counter() - started, status=status)
+
+
+class FakeWhatsappGateway:
+    """Локальный шлюз для тестов: принимает сообщения в память вместо отправки"""
+
+    def __init__(self):
+        self.messages: list[dict] = []
+        self.transport = httpx.MockTransport(self._handle)
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        message = json.loads(request.content)
+        self.messages.append(message)
+        return httpx.Response(200, json={"sent": True, "message": {"id": str(len(self.messages)), **message}})
+
+
+whatsapp = WhatsappHandler(
+    url=settings.WHATSAPP_API_URL,
+    token=settings.GET_WHATSAPP_API_KEY,
+    transport=FakeWhatsappGateway().transport if settings.WHATSAPP_FAKE_GATEWAY else None,
+)
@@ -0,0 +1,50 @@
+from typing import Optional
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.worklog.config.auth import auth
+from src.worklog.db.core import get_db
+from src.worklog.departments.models import Department
+from src.worklog.shifts.models import Shift
+from src.worklog.rules.models import Roles
+from .models import Users
+
+
+class CurrentUser:
+    """Пользователь текущего запроса вместе с ролью, отделом и сменой"""
+
+    def __init__(self, user: Users, role: Optional[Roles], department: Optional[Department], shift: Optional[Shift]):
+        self.user = user
+        self.role = role
+        self.department = department
+        self.shift = shift
+
+    @property
+    def id(self) -> int:
+        return self.user.id
+
+
+async def get_current_user(
+    request: Request,
+    user_data = Depends(auth.get_user_data_dependency()),
+    db: AsyncSession = Depends(get_db),
+) -> CurrentUser:
+    """Загружает пользователя из JWT одним запросом и кэширует его в request.state"""
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is not None:
+        return current_user
+
+    result = await db.execute(
+        select(Users, Roles, Department, Shift)
+        .outerjoin(Roles, Roles.id == Users.role)
+        .outerjoin(Department, Department.id == Users.department_id)
+        .outerjoin(Shift, Shift.id == Users.shift_id)
+        .where(Users.id == int(user_data["sub"]))
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    current_user = CurrentUser(*row)
+    request.state.current_user = current_user
+    return current_user
@@ -17,12 +17,12 @@ class Users(Base):
     middle_name: Mapped[str] = mapped_column(String(50))
 
     position: Mapped[str] = mapped_column(String(50), nullable=True)
-    department_id: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    department_id: Mapped[int] = mapped_column(Integer, nullable=False, default=1, index=True)
     shift_id: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
 
     role: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
 
-    chat_id_whatsapp: Mapped[str] = mapped_column(String(100), nullable=True)
+    chat_id_whatsapp: Mapped[str] = mapped_column(String(100), nullable=True, index=True)
     chat_id_telegram: Mapped[str] = mapped_column(String(100), nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False)
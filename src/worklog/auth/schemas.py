@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from src.worklog.users.schemas import RoleUser, DepartmentUser, ShiftUser, UserRead
 
 
 class UserCreate(BaseModel):
@@ -25,33 +26,6 @@ class UpdateUser(BaseModel):
     department_id: Optional[int] = Field(None, example=1)
     shift_id: Optional[int] = Field(None, example=1)
 
-class RoleUser(BaseModel):
-    id: int
-    name: Optional[str] = None
-
-class DepartmentUser(BaseModel):
-    id: int
-    display_name: str
-
-
-class ShiftUser(BaseModel):
-    id: int
-    display_name: str
-
-
-class UserRead(BaseModel):
-    id: int
-    first_name: str
-    last_name: str
-    middle_name: Optional[str] = None
-    phone: str
-    position: Optional[str] = None
-    department: Optional[DepartmentUser] = None
-    shift: Optional[ShiftUser] = None
-    role: Optional[RoleUser] = None
-    is_superuser: bool
-
-
 class UserLogin(BaseModel):
     phone: str = Field(..., min_length=1, max_length=12, example="+77071234567")
     password: str = Field(..., min_length=8, max_length=256, example="SuperPassword123")
@@ -7,7 +7,8 @@ from .utils import hash_password, verify_password
 from sqlalchemy.exc import IntegrityError
 from src.worklog.departments.models import Department
 from src.worklog.shifts.models import Shift
-from src.worklog.rules.models import Roles
+from src.worklog.rules.permissions import permission_cache
+from src.worklog.users.service import user_read_query, build_user_read, assemble_user_reads
 
 
 def trim(phone: str) -> str:
@@ -71,44 +72,10 @@ class UserService:
             )
             self.db.add(new_user)
             await self.db.commit()
+            permission_cache.invalidate()
             await self.db.refresh(new_user)
 
-            # Получаем данные отдела и смены
-            department = None
-            shift = None
-            role = None
-
-
-            if user.department_id:
-                department = await self.db.execute(
-                    select(Department).where(Department.id == new_user.department_id)
-                )
-                department = department.scalar_one_or_none()
-            
-            if user.shift_id:
-                shift = await self.db.execute(
-                    select(Shift).where(Shift.id == new_user.shift_id)
-                )
-                shift = shift.scalar_one_or_none()
-            
-            if user.role:
-                role = await self.db.execute(
-                    select(Roles).where(Roles.id == new_user.role)
-                )
-                role = role.scalar_one_or_none()
-            
-            return UserRead(
-                id=new_user.id,
-                first_name=new_user.first_name,
-                last_name=new_user.last_name,
-                middle_name=new_user.middle_name,
-                phone=new_user.phone,
-                position=new_user.position,
-                department=DepartmentUser(id=department.id, display_name=department.name) if department else None,
-                shift=ShiftUser(id=shift.id, display_name=shift.name) if shift else None,
-                role=RoleUser(id=role.id, name=role.name) if role else None,
-                is_superuser=new_user.is_superuser
-            )
+            return (await assemble_user_reads(self.db, [new_user]))[0]
         
         except IntegrityError as e:
             await self.db.rollback()
@@ -133,10 +100,11 @@ class UserService:
 
     async def authenticate_user(self, phone: str, password: str) -> UserRead:
         """Аутентификация пользователя и возврат его данных"""
-        user = await self.db.execute(
-            select(Users).where(Users.phone == trim(phone))
+        row = await self.db.execute(
+            user_read_query().where(Users.phone == trim(phone))
         )
-        user = user.scalar_one_or_none()
+        row = row.one_or_none()
+        user = row[0] if row else None
         
         if not user or not verify_password(password, user.password):
             raise HTTPException(
@@ -168,50 +136,16 @@ class UserService:
                 }
             )
         
-        # Получаем данные отдела и смены
-        department = None
-        shift = None
-        role = None
-        
-        if user.department_id:
-            department = await self.db.execute(
-                select(Department).where(Department.id == user.department_id)
-            )
-            department = department.scalar_one_or_none()
-        
-        if user.shift_id:
-            shift = await self.db.execute(
-                select(Shift).where(Shift.id == user.shift_id)
-            )
-            shift = shift.scalar_one_or_none()
-        
-        if user.role:
-            role = await self.db.execute(
-                select(Roles).where(Roles.id == user.role)
-            )
-            role = role.scalar_one_or_none()
-        
-        return UserRead(
-            id=user.id,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            middle_name=user.middle_name,
-            phone=user.phone,
-            position=user.position,
-            department=DepartmentUser(id=department.id, display_name=department.name) if department else None,
-            shift=ShiftUser(id=shift.id, display_name=shift.name) if shift else None,
-            role=RoleUser(id=role.id, name=role.name) if role else None,
-            is_superuser=user.is_superuser
-        )
+        return build_user_read(*row)
 
     async def get_user_profile(self, user_id: int) -> UserRead:
         """Получение профиля пользователя по ID"""
-        user = await self.db.execute(
-            select(Users).where(Users.id == user_id)
+        row = await self.db.execute(
+            user_read_query().where(Users.id == user_id)
         )
-        user = user.scalar_one_or_none()
+        row = row.one_or_none()
         
-        if not user:
+        if not row:
             raise HTTPException(
                 status_code=404,
                 detail={
@@ -221,39 +155,4 @@ class UserService:
                 }
             )
         
-        # Получаем данные отдела и смены
-        department = None
-        shift = None
-        role = None
-        
-        if user.department_id:
-            department = await self.db.execute(
-                select(Department).where(Department.id == user.department_id)
-            )
-            department = department.scalar_one_or_none()
-        
-        if user.shift_id:
-            shift = await self.db.execute(
-                select(Shift).where(Shift.id == user.shift_id)
-            )
-            shift = shift.scalar_one_or_none()
-        
-        if user.role:
-            role = await self.db.execute(
-                select(Roles).where(Roles.id == user.role)
-            )
-            role = role.scalar_one_or_none()
-        
-        return UserRead(
-            id=user.id,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            middle_name=user.middle_name,
-            phone=user.phone,
-            position=user.position,
-            department=DepartmentUser(id=department.id, display_name=department.name) if department else None,
-            shift=ShiftUser(id=shift.id, display_name=shift.name) if shift else None,
-            role=RoleUser(id=role.id, name=role.name) if role else None,
-            is_superuser=user.is_superuser
-        )
-    
\ No newline at end of file
+        return build_user_read(*row)
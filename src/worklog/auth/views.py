@@ -4,6 +4,8 @@ from .schemas import *
 from src.worklog.config.auth import auth
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.worklog.db.core import get_db
+from src.worklog.users.service import build_user_read
+from .dependencies import CurrentUser, get_current_user
 
 router = APIRouter(prefix="/api/v1/auth", tags=["🔑AUTH - access-portal"])
 
@@ -28,8 +30,6 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     return user
 
 @router.get("/get-me", response_model=UserRead)
-async def get_me(user_data = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    user_service = UserService(db)
-    user = await user_service.get_user_profile(int(user_data['sub']))
-    return user
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
+    return build_user_read(current_user.user, current_user.department, current_user.shift, current_user.role)
 
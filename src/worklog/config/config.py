@@ -11,16 +11,136 @@ class Settings(BaseSettings):
     DB_HOST: str = os.getenv("DB_HOST")
     DB_PORT: int = os.getenv("DB_PORT")
 
+    # Пул соединений (на один воркер uvicorn)
+    DB_POOL_SIZE: int = os.getenv("DB_POOL_SIZE", 10)
+    DB_MAX_OVERFLOW: int = os.getenv("DB_MAX_OVERFLOW", 10)
+    DB_POOL_TIMEOUT: float = os.getenv("DB_POOL_TIMEOUT", 10)
+    DB_POOL_RECYCLE: int = os.getenv("DB_POOL_RECYCLE", 1800)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", True)
+    DB_STATEMENT_TIMEOUT_MS: int = os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000)
+    DB_STATEMENT_CACHE_SIZE: int = os.getenv("DB_STATEMENT_CACHE_SIZE", 100)
+
+    # Бюджет SQL-запросов на один HTTP-запрос (0 - без ограничения).
+    # DB_QUERY_BUDGET_STRICT=true в тестах превращает превышение в ошибку
+    DB_QUERY_BUDGET: int = os.getenv("DB_QUERY_BUDGET", 0)
+    DB_QUERY_REPEAT_LIMIT: int = os.getenv("DB_QUERY_REPEAT_LIMIT", 0)
+    DB_QUERY_BUDGET_STRICT: bool = os.getenv("DB_QUERY_BUDGET_STRICT", False)
+
+    # Время жизни снимка прав в воркере, сек
+    RBAC_CACHE_TTL: float = os.getenv("RBAC_CACHE_TTL", 60)
+
+    RABBITMQ_HOST: str = os.getenv("RABBITMQ_HOST", "rabbitmq")
+    RABBITMQ_PORT: int = os.getenv("RABBITMQ_PORT", 5672)
+    RABBITMQ_USER: str = os.getenv("RABBITMQ_USER", "user")
+    RABBITMQ_PASSWORD: str = os.getenv("RABBITMQ_PASSWORD", "password")
+    RABBITMQ_QUEUE: str = os.getenv("RABBITMQ_QUEUE", "chat_queue")
+    RABBITMQ_CHANNEL_POOL_SIZE: int = os.getenv("RABBITMQ_CHANNEL_POOL_SIZE", 4)
+    RABBITMQ_CONNECT_TIMEOUT: float = os.getenv("RABBITMQ_CONNECT_TIMEOUT", 5)
+    # 1 - отправлять сразу; больше 1 - копить пачку не дольше RABBITMQ_BATCH_DELAY_MS
+    RABBITMQ_BATCH_SIZE: int = os.getenv("RABBITMQ_BATCH_SIZE", 1)
+    RABBITMQ_BATCH_DELAY_MS: int = os.getenv("RABBITMQ_BATCH_DELAY_MS", 50)
+
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY")
+    ANTHROPIC_MODEL: str = os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")
+    ANTHROPIC_MAX_TOKENS: int = os.getenv("ANTHROPIC_MAX_TOKENS", 1000)
+    # Быстрая модель для простых ходов и пороги маршрутизации
+    AI_FAST_MODEL: str = os.getenv("AI_FAST_MODEL", "claude-3-5-haiku-20241022")
+    AI_FAST_MAX_TOKENS: int = os.getenv("AI_FAST_MAX_TOKENS", 600)
+    AI_ROUTING_ENABLED: bool = os.getenv("AI_ROUTING_ENABLED", True)
+    AI_ROUTE_SHORT_CHARS: int = os.getenv("AI_ROUTE_SHORT_CHARS", 200)
+    AI_ROUTE_MAX_DEPTH: int = os.getenv("AI_ROUTE_MAX_DEPTH", 20)
+    AI_ROUTE_MAX_CONTEXT_TOKENS: int = os.getenv("AI_ROUTE_MAX_CONTEXT_TOKENS", 4000)
+    # Одновременных вызовов модели на воркер; остальные ждут своей очереди
+    ANTHROPIC_MAX_CONCURRENCY: int = os.getenv("ANTHROPIC_MAX_CONCURRENCY", 4)
+    ANTHROPIC_TIMEOUT: float = os.getenv("ANTHROPIC_TIMEOUT", 60)
+    ANTHROPIC_CONNECT_TIMEOUT: float = os.getenv("ANTHROPIC_CONNECT_TIMEOUT", 5)
+    ANTHROPIC_MAX_RETRIES: int = os.getenv("ANTHROPIC_MAX_RETRIES", 2)
+
+    # Как часто воркер сверяет версию закэшированного агента с БД, сек
+    AI_AGENT_CACHE_TTL: float = os.getenv("AI_AGENT_CACHE_TTL", 30)
+
+    # Бюджет истории диалога в токенах; более старое сворачивается в краткое содержание
+    AI_CONTEXT_MAX_TOKENS: int = os.getenv("AI_CONTEXT_MAX_TOKENS", 8000)
+    AI_CONTEXT_FETCH_BATCH: int = os.getenv("AI_CONTEXT_FETCH_BATCH", 50)
+    AI_SUMMARY_MODEL: str = os.getenv("AI_SUMMARY_MODEL", "claude-3-5-haiku-20241022")
+    AI_SUMMARY_MAX_TOKENS: int = os.getenv("AI_SUMMARY_MAX_TOKENS", 600)
+    AI_SUMMARY_BATCH: int = os.getenv("AI_SUMMARY_BATCH", 200)
+    AI_SUMMARY_TOOL_OUTPUT_CHARS: int = os.getenv("AI_SUMMARY_TOOL_OUTPUT_CHARS", 500)
+    # Таймаут внешних (HTTP) инструментов агента, сек
+    AI_TOOL_HTTP_TIMEOUT: float = os.getenv("AI_TOOL_HTTP_TIMEOUT", 15)
+    # Предел на один вызов инструмента; вызовы одного хода идут параллельно
+    AI_TOOL_TIMEOUT: float = os.getenv("AI_TOOL_TIMEOUT", 20)
+
+    # Фоновые обработчики ИИ-ассистента (вебхук, очередь чата) в этом процессе
+    AI_WORKERS_ENABLED: bool = os.getenv("AI_WORKERS_ENABLED", False)
+    AI_AGENT_ID: int = os.getenv("AI_AGENT_ID", 1)
+    # Сообщения пользователя с паузой меньше AI_DEBOUNCE_SECONDS - один ход агента,
+    # но ход начинается не позже AI_DEBOUNCE_MAX_WAIT от первого сообщения
+    AI_DEBOUNCE_SECONDS: float = os.getenv("AI_DEBOUNCE_SECONDS", 4)
+    AI_DEBOUNCE_MAX_WAIT: float = os.getenv("AI_DEBOUNCE_MAX_WAIT", 15)
+    AI_CONSUMER_PREFETCH: int = os.getenv("AI_CONSUMER_PREFETCH", 100)
+    # Сколько раз подряд повторять упавший ход пользователя, прежде чем отбросить события
+    AI_TURN_MAX_ATTEMPTS: int = os.getenv("AI_TURN_MAX_ATTEMPTS", 3)
+    # Быстрый путь для типовых команд ("мои задачи", "задача N выполнена", отчёт по смене)
+    AI_INTENTS_ENABLED: bool = os.getenv("AI_INTENTS_ENABLED", True)
+    WEBHOOK_BATCH_SIZE: int = os.getenv("WEBHOOK_BATCH_SIZE", 20)
+    WEBHOOK_POLL_INTERVAL: float = os.getenv("WEBHOOK_POLL_INTERVAL", 2)
+    WEBHOOK_LEASE_SECONDS: float = os.getenv("WEBHOOK_LEASE_SECONDS", 60)
+    WEBHOOK_MAX_ATTEMPTS: int = os.getenv("WEBHOOK_MAX_ATTEMPTS", 5)
+    # Сколько последних id сообщений шлюза помнить для отсева повторов
+    WEBHOOK_RECENT_IDS: int = os.getenv("WEBHOOK_RECENT_IDS", 10000)
+    # Кэш chat_id -> пользователь в воркере
+    AI_CHAT_CACHE_TTL: float = os.getenv("AI_CHAT_CACHE_TTL", 300)
+    AI_CHAT_CACHE_SIZE: int = os.getenv("AI_CHAT_CACHE_SIZE", 10000)
+
     TELEGRAM_API_KEY: str = os.getenv("TELEGRAM_API_KEY")
     WHATSAPP_API_KEY: str = os.getenv("WHATSAPP_API_KEY")
 
+    # Шлюз WhatsApp (whapi.cloud): один keep-alive клиент на воркер
+    WHATSAPP_API_URL: str = os.getenv("WHATSAPP_API_URL", "https://gate.whapi.cloud/messages/text")
+    WHATSAPP_HTTP2: bool = os.getenv("WHATSAPP_HTTP2", True)
+    WHATSAPP_MAX_CONNECTIONS: int = os.getenv("WHATSAPP_MAX_CONNECTIONS", 20)
+    WHATSAPP_MAX_KEEPALIVE_CONNECTIONS: int = os.getenv("WHATSAPP_MAX_KEEPALIVE_CONNECTIONS", 10)
+    WHATSAPP_KEEPALIVE_EXPIRY: float = os.getenv("WHATSAPP_KEEPALIVE_EXPIRY", 30)
+    WHATSAPP_CONNECT_TIMEOUT: float = os.getenv("WHATSAPP_CONNECT_TIMEOUT", 5)
+    WHATSAPP_READ_TIMEOUT: float = os.getenv("WHATSAPP_READ_TIMEOUT", 15)
+    WHATSAPP_POOL_TIMEOUT: float = os.getenv("WHATSAPP_POOL_TIMEOUT", 5)
+    # true - сообщения не уходят наружу, а складываются в FakeWhatsappGateway
+    WHATSAPP_FAKE_GATEWAY: bool = os.getenv("WHATSAPP_FAKE_GATEWAY", False)
+
+    # Диспетчер исходящих уведомлений (outbox)
+    OUTBOX_ENABLED: bool = os.getenv("OUTBOX_ENABLED", True)
+    OUTBOX_POLL_INTERVAL: float = os.getenv("OUTBOX_POLL_INTERVAL", 2)
+    OUTBOX_BATCH_SIZE: int = os.getenv("OUTBOX_BATCH_SIZE", 50)
+    OUTBOX_CONCURRENCY: int = os.getenv("OUTBOX_CONCURRENCY", 5)
+    OUTBOX_MAX_ATTEMPTS: int = os.getenv("OUTBOX_MAX_ATTEMPTS", 8)
+    OUTBOX_BACKOFF_BASE: float = os.getenv("OUTBOX_BACKOFF_BASE", 5)
+    OUTBOX_BACKOFF_MAX: float = os.getenv("OUTBOX_BACKOFF_MAX", 900)
+    # Сколько строка считается занятой воркером; после - забирается повторно
+    OUTBOX_LEASE_SECONDS: float = os.getenv("OUTBOX_LEASE_SECONDS", 60)
+
+    # Сообщения одному получателю за окно, сек, уходят одним дайджестом
+    NOTIFY_COALESCE_WINDOW: float = os.getenv("NOTIFY_COALESCE_WINDOW", 30)
+    NOTIFY_DIGEST_MAX_ITEMS: int = os.getenv("NOTIFY_DIGEST_MAX_ITEMS", 20)
+    # Лимит запросов к шлюзу WhatsApp на воркер; 0 - без ограничения
+    NOTIFY_WHATSAPP_RATE: float = os.getenv("NOTIFY_WHATSAPP_RATE", 5)
+    NOTIFY_WHATSAPP_BURST: int = os.getenv("NOTIFY_WHATSAPP_BURST", 10)
+    # Лимит сообщений одному получателю; лишние откладываются, а не ждут в воркере. 0 - без ограничения
+    NOTIFY_RECIPIENT_RATE: float = os.getenv("NOTIFY_RECIPIENT_RATE", 0.2)
+    NOTIFY_RECIPIENT_BURST: int = os.getenv("NOTIFY_RECIPIENT_BURST", 3)
+    # Как часто пересчитывать глубину и задержку очереди для метрик, сек
+    OUTBOX_STATS_INTERVAL: float = os.getenv("OUTBOX_STATS_INTERVAL", 15)
+
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY")
 
     @property
     def DATABASE_URL_asyncpg(self):
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.POSTGRES_DB}"
     
+    @property
+    def RABBITMQ_URL(self):
+        return f"amqp://{self.RABBITMQ_USER}:{self.RABBITMQ_PASSWORD}@{self.RABBITMQ_HOST}:{self.RABBITMQ_PORT}/"
+
     @property
     def GET_TELEGRAM_API_KEY(self):
         return self.TELEGRAM_API_KEY
@@ -1,17 +1,82 @@
-from typing import Annotated
+import time
+from typing import Annotated, Optional
 
 from sqlalchemy import String
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.worklog.config.config import settings
+from src.worklog.db.instrumentation import instrument_engine
+from src.worklog.metrics.service import metrics
 
-async_engine = create_async_engine(
-    url=settings.DATABASE_URL_asyncpg,
-    echo=False,
-)
 
-async_session_factory = async_sessionmaker(async_engine)
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который замеряет время ожидания свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe("db.pool.checkout_wait_seconds", time.perf_counter() - started)
+
+
+def build_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        url=settings.DATABASE_URL_asyncpg,
+        echo=False,
+        poolclass=TimedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+            },
+        },
+    )
+
+
+async_engine: Optional[AsyncEngine] = None
+
+# Привязывается к движку в init_engine() при старте приложения
+async_session_factory = async_sessionmaker()
+
+
+def init_engine() -> AsyncEngine:
+    global async_engine
+    if async_engine is None:
+        async_engine = build_async_engine()
+        instrument_engine(async_engine)
+        async_session_factory.configure(bind=async_engine)
+    return async_engine
+
+
+async def dispose_engine():
+    global async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+
+
+def _pool_status() -> dict:
+    if async_engine is None:
+        return {}
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+metrics.register_gauge("db.pool", _pool_status)
 
 str_256 = Annotated[str, 256]
 
@@ -36,4 +101,3 @@ class Base(DeclarativeBase):
 async def get_db() -> AsyncSession:
     async with async_session_factory() as session:
         yield session
-
@@ -0,0 +1,125 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.worklog.config.config import settings
+from src.worklog.metrics.service import metrics
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"IN \((?:\$\d+(?:::\w+)?,?\s*)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Нормализует SQL: одинаковые запросы с разной длиной IN (...) считаются одной формой"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("IN (...)", shape)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    """Статистика SQL-запросов в рамках одного HTTP-запроса (или блока кода)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, limit: int) -> list[tuple[str, int]]:
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= limit]
+
+    def problems(self, max_queries: Optional[int] = None, max_repeats: Optional[int] = None) -> list[str]:
+        problems = []
+        if max_queries and self.count > max_queries:
+            problems.append(f"{self.count} queries, budget is {max_queries}")
+        if max_repeats:
+            for shape, n in self.repeated(max_repeats):
+                problems.append(f"statement repeated {n} times (N+1?): {shape[:200]}")
+        return problems
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+    """
+    Для тестов: падает, если блок выполнил больше max_queries запросов
+    или повторил один и тот же запрос max_repeats раз и больше.
+
+        with assert_query_budget(max_queries=5, max_repeats=3):
+            client.get("/api/v1/tasks/task/details/1")
+    """
+    with track_queries() as stats:
+        yield stats
+    problems = stats.problems(max_queries, max_repeats)
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Время храним в контексте выполнения: при ошибке запроса он просто отбрасывается
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start_time
+    metrics.inc("db.queries")
+    metrics.observe("db.query_seconds", elapsed)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def instrument_engine(engine: AsyncEngine):
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def query_stats_middleware(request: Request, call_next):
+    with track_queries() as stats:
+        response = await call_next(request)
+
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = f"{stats.total_time * 1000:.1f}"
+
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    metrics.observe("http.db_queries", stats.count, route=route_path)
+    metrics.observe("http.db_time_seconds", stats.total_time, route=route_path)
+
+    problems = stats.problems(settings.DB_QUERY_BUDGET, settings.DB_QUERY_REPEAT_LIMIT)
+    if problems:
+        message = f"{request.method} {route_path}: " + "; ".join(problems)
+        if settings.DB_QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget exceeded: %s", message)
+
+    return response
@@ -0,0 +1,117 @@
+import base64
+import json
+from typing import Annotated, Any, Optional, Sequence
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class PageParams:
+    """Параметры keyset-пагинации из query string"""
+
+    def __init__(
+        self,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        cursor: Annotated[Optional[str], Query(description="next_cursor из предыдущей страницы")] = None,
+        estimate_total: Annotated[bool, Query(description="Оценка общего количества по статистике планировщика")] = False,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.estimate_total = estimate_total
+
+
+class Page:
+    def __init__(self, rows: list, next_cursor: Optional[str], estimated_total: Optional[int]):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.estimated_total = estimated_total
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_count(db: AsyncSession, query: Select) -> Optional[int]:
+    """Оценка числа строк по плану запроса, без полного COUNT(*)"""
+    if db.bind.dialect.name != "postgresql":
+        return None
+    plan = (await db.execute(Explain(query))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _key_value(row, column):
+    """Значение колонки ключа: из выбранных колонок или из ORM-сущности в строке"""
+    mapping = row._mapping
+    if column in mapping:
+        return mapping[column]
+    entity = getattr(column, "class_", None)
+    for value in row:
+        if entity is not None and isinstance(value, entity):
+            return getattr(value, column.key)
+    raise KeyError(f"Key column {column} is not selected")
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    key_columns: Sequence,
+    params: PageParams,
+    descending: bool = False,
+) -> Page:
+    """
+    Keyset-пагинация по уникальному набору колонок key_columns.
+    Значения ключа последней строки кодируются в непрозрачный курсор,
+    поэтому стоимость страницы не зависит от её номера.
+    """
+    key = tuple_(*key_columns) if len(key_columns) > 1 else key_columns[0]
+
+    page_query = query
+    if params.cursor:
+        values = decode_cursor(params.cursor, len(key_columns))
+        boundary = tuple_(*values) if len(values) > 1 else values[0]
+        page_query = page_query.where(key < boundary if descending else key > boundary)
+
+    order = [column.desc() if descending else column.asc() for column in key_columns]
+    result = await db.execute(page_query.order_by(*order).limit(params.limit + 1))
+    rows = list(result.all())
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        next_cursor = encode_cursor([_key_value(rows[-1], column) for column in key_columns])
+
+    estimated_total = await estimate_count(db, query) if params.estimate_total else None
+
+    return Page(rows, next_cursor, estimated_total)
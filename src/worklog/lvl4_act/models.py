@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, DateTime, func, Integer, Boolean, Enum as SQLAlchemyEnum
+from sqlalchemy import String, DateTime, func, Integer, Boolean, Index, Enum as SQLAlchemyEnum
 from datetime import datetime
 from src.worklog.db.core import Base
 from enum import Enum
@@ -43,7 +43,7 @@ class ActItems(Base):
     __tablename__ = 'act_items_4'
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    act_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    act_id: Mapped[int] = mapped_column(Integer, nullable=True, index=True)
     content: Mapped[str] = mapped_column(String(1000), nullable=False)
     requirement: Mapped[str] = mapped_column(String(500), nullable=False)
     note: Mapped[str] = mapped_column(String(500), nullable=True)
@@ -65,6 +65,9 @@ class ActReport(Base):
 
 class ActAndTaskRelation(Base):
     __tablename__ = 'act_and_task_relation_4'
+    __table_args__ = (
+        Index('uq_act_and_task_relation_4_act_item_id', 'act_item_id', unique=True),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     act_item_id: Mapped[int] = mapped_column(Integer, nullable=True)
     task_id: Mapped[int] = mapped_column(Integer, nullable=True)
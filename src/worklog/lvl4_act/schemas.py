@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from .models import Mine
 from datetime import datetime
+from typing import Optional
 
 #POST METHODS
 class ActCreate(BaseModel):
@@ -59,6 +60,18 @@ class ActReportList(BaseModel):
     items: list[ActReport]
     total: int
 
+class ActResponsibleSummary(BaseModel):
+    responsible_user: Optional[ActUsers] = None
+    total: int
+    done: int
+    overdue: int
+
+class ActReportSummary(BaseModel):
+    total: int
+    done: int
+    overdue: int
+    by_responsible: list[ActResponsibleSummary]
+
 class ActResp(BaseModel):
     id: int
     title: str
@@ -69,6 +82,8 @@ class ActResp(BaseModel):
 class ActListResp(BaseModel):
     acts: list[ActResp]
     total: int
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
 
 class ActDetails(BaseModel):
     id: int
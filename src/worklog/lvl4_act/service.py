@@ -1,17 +1,74 @@
 from .schemas import *
 from .models import *
+from .schemas import ActReport as ActReportItem
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, and_, or_, func, literal, union_all
 from src.worklog.auth.models import Users
 from src.worklog.tasks.models import Tasks, TaskAssignees
 from src.worklog.db.core import get_db
-from src.worklog.ai.whatsapp_handler import WhatsappHandler
+from src.worklog.db.pagination import PageParams, paginate
+from src.worklog.notifications.service import NotificationService
+from src.worklog.notifications.models import NotificationPriority
+from src.worklog.notifications.dispatcher import dispatcher as outbox_dispatcher
+
+# Статусы задач, при которых пункт акта считается выполненным
+DONE_STATUSES = ("done", "completed")
+
+REPORT_STREAM_BATCH = 200
+
+REPORT_USER_COLUMNS = (
+    Users.id.label("user_id"),
+    Users.first_name,
+    Users.last_name,
+    Users.middle_name,
+    Users.position,
+)
+
+
+def act_report_query(act_id: int):
+    """Пункты акта со статусом связанной задачи и ответственным одним запросом"""
+    return (
+        select(ActItems, Tasks.status.label("task_status"), *REPORT_USER_COLUMNS)
+        .outerjoin(ActAndTaskRelation, ActAndTaskRelation.act_item_id == ActItems.id)
+        .outerjoin(Tasks, Tasks.id == ActAndTaskRelation.task_id)
+        .outerjoin(Users, Users.id == ActItems.responsible_user)
+        .where(ActItems.act_id == act_id)
+        .order_by(ActItems.id)
+    )
+
+
+def build_act_user(row) -> Optional[ActUsers]:
+    if row.user_id is None:
+        return None
+    return ActUsers(
+        id=row.user_id,
+        first_name=row.first_name,
+        last_name=row.last_name,
+        middle_name=row.middle_name,
+        position=row.position
+    )
+
+
+def build_report_item(row) -> ActReportItem:
+    item = row.ActItems
+    return ActReportItem(
+        id=item.id,
+        content=item.content,
+        requirement=item.requirement,
+        note=item.note,
+        responsible_user=build_act_user(row),
+        deadline=item.deadline,
+        created_at=item.created_at,
+        updated_at=item.updated_at,
+        status=row.task_status or "unknown"
+    )
+
 
 class ActService:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.whatsapp_handler = WhatsappHandler()
 
     async def create_act(self, act: ActCreate) -> ActResp:
         try:
@@ -72,10 +129,10 @@ class ActService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def get_all_acts(self) -> ActListResp:
+    async def get_all_acts(self, page: PageParams = None) -> ActListResp:
         try:
-            acts = await self.db.execute(select(Act))
-            acts_list = acts.scalars().all()
+            page = await paginate(self.db, select(Act), (Act.id,), page or PageParams())
+            acts_list = [row.Act for row in page.rows]
             total = len(acts_list)
             return ActListResp(
                 acts=[ActResp(
@@ -86,7 +143,9 @@ class ActService:
                     requirement=act.requirement,
                     at=act.at
                 ) for act in acts_list],
-                total=total
+                total=total,
+                next_cursor=page.next_cursor,
+                estimated_total=page.estimated_total
             )
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
@@ -98,61 +157,38 @@ class ActService:
             if not act_db:
                 raise HTTPException(status_code=404, detail="Act not found")
             
-            whom_query = await self.db.execute(select(ActWhom).where(ActWhom.act_id == act_id)) 
-            whom_db = whom_query.scalars().all()
-
-            from_whom_query = await self.db.execute(select(ActFrom).where(ActFrom.act_id == act_id))
-            from_whom_db = from_whom_query.scalars().all()
-
-            items_query = await self.db.execute(select(ActItems).where(ActItems.act_id == act_id))
-            items_db = items_query.scalars().all()
+            # Подписанты обеих сторон одним запросом
+            signatories = union_all(
+                select(literal("whom").label("side"), ActWhom.id.label("link_id"), ActWhom.user_id)
+                .where(ActWhom.act_id == act_id),
+                select(literal("from").label("side"), ActFrom.id.label("link_id"), ActFrom.user_id)
+                .where(ActFrom.act_id == act_id),
+            ).subquery()
+            signatories_query = await self.db.execute(
+                select(signatories.c.side, *REPORT_USER_COLUMNS)
+                .join(Users, Users.id == signatories.c.user_id)
+                .order_by(signatories.c.link_id)
+            )
 
-            # Get user information for whom and from_whom
             whom_users = []
             from_whom_users = []
-            
-            for whom in whom_db:
-                user_query = await self.db.execute(select(Users).where(Users.id == whom.user_id))
-                user = user_query.scalar_one_or_none()
-                if user:
-                    whom_users.append(ActUsers(
-                        id=user.id,
-                        first_name=user.first_name,
-                        last_name=user.last_name,
-                        middle_name=user.middle_name,
-                        position=user.position
-                    ))
-
-            for from_whom in from_whom_db:
-                user_query = await self.db.execute(select(Users).where(Users.id == from_whom.user_id))
-                user = user_query.scalar_one_or_none()
-                if user:
-                    from_whom_users.append(ActUsers(
-                        id=user.id,
-                        first_name=user.first_name,
-                        last_name=user.last_name,
-                        middle_name=user.middle_name,
-                        position=user.position
-                    ))
-
-            # Получаем информацию о пользователях для элементов акта
+            for row in signatories_query.all():
+                users = whom_users if row.side == "whom" else from_whom_users
+                users.append(build_act_user(row))
+
+            # Пункты акта вместе с ответственными
+            items_query = await self.db.execute(
+                select(ActItems, *REPORT_USER_COLUMNS)
+                .outerjoin(Users, Users.id == ActItems.responsible_user)
+                .where(ActItems.act_id == act_id)
+                .order_by(ActItems.id)
+            )
+
             items_with_users = []
-            for item in items_db:
-                responsible_user = None
-                if item.responsible_user:
-                    user_query = await self.db.execute(select(Users).where(Users.id == item.responsible_user))
-                    user = user_query.scalar_one_or_none()
-                    if user:
-                        responsible_user = ActUsers(
-                            id=user.id,
-                            first_name=user.first_name,
-                            last_name=user.last_name,
-                            middle_name=user.middle_name,
-                            position=user.position
-                        )
-                
-                # Создаем словарь с данными элемента акта
-                item_dict = {
+            for row in items_query.all():
+                item = row.ActItems
+                responsible_user = build_act_user(row)
+                items_with_users.append({
                     "id": item.id,
                     "content": item.content,
                     "requirement": item.requirement,
@@ -161,8 +197,7 @@ class ActService:
                     "deadline": item.deadline,
                     "created_at": item.created_at,
                     "updated_at": item.updated_at
-                }
-                items_with_users.append(item_dict)
+                })
 
             return ActDetails(
                 id=act_db.id,
@@ -281,8 +316,11 @@ class ActService:
             )
             self.db.add(task_assignee)
             await self.db.flush()
-            user = await self.db.get(Users, item.responsible_user)
-            await self.whatsapp_handler.send_message(f"Вы были назначены на задачу {task_title}", user.chat_id_whatsapp)
+            NotificationService(self.db).enqueue_whatsapp(
+                f"Вы были назначены на задачу {task_title}",
+                user_id=item.responsible_user,
+                priority=NotificationPriority.ASSIGNMENT,
+            )
             # Step 4: Create the relation
             new_relation = ActAndTaskRelation(
                 act_item_id=item_id,
@@ -292,6 +330,7 @@ class ActService:
             
             # Step 5: Commit all changes
             await self.db.commit()
+            outbox_dispatcher.wake()
             
             
             # Step 6: Return success response using the stored ID
@@ -344,67 +383,72 @@ class ActService:
 
     async def get_act_report(self, act_id: int) -> ActReportList:
         try:
-            # Get all act items for the given act_id
-            act_query = await self.db.execute(select(ActItems).where(ActItems.act_id == act_id))
-            act_db = act_query.scalars().all()
-            if not act_db:
+            result = await self.db.execute(act_report_query(act_id))
+            report_items = [build_report_item(row) for row in result.all()]
+            if not report_items:
                 raise HTTPException(status_code=404, detail="Act not found")
 
-            # Create a list to store the report items with task status
-            report_items = []
-            
-            # For each act item, get the related task status
-            for item in act_db:
-                # Get the task relation
-                relation_query = await self.db.execute(
-                    select(ActAndTaskRelation).where(ActAndTaskRelation.act_item_id == item.id)
-                )
-                relation = relation_query.scalar_one_or_none()
-                
-                # Default status if no task is found
-                task_status = "unknown"
-                
-                # If relation exists, get the task status
-                if relation:
-                    task_query = await self.db.execute(
-                        select(Tasks).where(Tasks.id == relation.task_id)
-                    )
-                    task = task_query.scalar_one_or_none()
-                    if task:
-                        task_status = task.status
-                
-                # Get responsible user information
-                responsible_user = None
-                if item.responsible_user:
-                    user_query = await self.db.execute(select(Users).where(Users.id == item.responsible_user))
-                    user = user_query.scalar_one_or_none()
-                    if user:
-                        responsible_user = ActUsers(
-                            id=user.id,
-                            first_name=user.first_name,
-                            last_name=user.last_name,
-                            middle_name=user.middle_name,
-                            position=user.position
-                        )
-                
-                # Create the report item with the task status using the Pydantic schema
-                from .schemas import ActReport
-                report_item = ActReport(
-                    id=item.id,
-                    content=item.content,
-                    requirement=item.requirement,
-                    note=item.note,
-                    responsible_user=responsible_user,
-                    deadline=item.deadline,
-                    created_at=item.created_at,
-                    updated_at=item.updated_at,
-                    status=task_status
-                )
-                report_items.append(report_item)
-
             return ActReportList(
                 items=report_items,
                 total=len(report_items)
             )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def stream_act_report(self, act_id: int):
+        """Пункты отчёта по одному, без загрузки всего акта в память"""
+        result = await self.db.stream(
+            act_report_query(act_id).execution_options(yield_per=REPORT_STREAM_BATCH)
+        )
+        async for row in result:
+            yield build_report_item(row)
+
+    async def get_act_report_summary(self, act_id: int) -> ActReportSummary:
+        try:
+            done = Tasks.status.in_(DONE_STATUSES)
+            overdue = and_(ActItems.deadline < func.now(), or_(Tasks.status.is_(None), ~done))
+            counters = (
+                func.count(ActItems.id).label("total"),
+                func.count(ActItems.id).filter(done).label("done"),
+                func.count(ActItems.id).filter(overdue).label("overdue"),
+            )
+
+            def with_tasks(query):
+                return (
+                    query
+                    .select_from(ActItems)
+                    .outerjoin(ActAndTaskRelation, ActAndTaskRelation.act_item_id == ActItems.id)
+                    .outerjoin(Tasks, Tasks.id == ActAndTaskRelation.task_id)
+                    .where(ActItems.act_id == act_id)
+                )
+
+            totals = (await self.db.execute(with_tasks(select(*counters)))).one()
+            if not totals.total:
+                raise HTTPException(status_code=404, detail="Act not found")
+
+            by_user = await self.db.execute(
+                with_tasks(select(*REPORT_USER_COLUMNS, *counters))
+                .outerjoin(Users, Users.id == ActItems.responsible_user)
+                .group_by(*REPORT_USER_COLUMNS)
+                .order_by(Users.id)
+            )
+
+            return ActReportSummary(
+                total=totals.total,
+                done=totals.done,
+                overdue=totals.overdue,
+                by_responsible=[
+                    ActResponsibleSummary(
+                        responsible_user=build_act_user(row),
+                        total=row.total,
+                        done=row.done,
+                        overdue=row.overdue
+                    ) for row in by_user.all()
+                ]
+            )
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,73 @@
+from typing import Any, Callable
+
+
+class Summary:
+    """Счётчик наблюдений: количество, сумма и максимум"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": round(self.total, 6),
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+        }
+
+
+class MetricsRegistry:
+    """Метрики процесса (одного воркера uvicorn)"""
+
+    def __init__(self):
+        self._counters: dict[str, float] = {}
+        self._summaries: dict[str, Summary] = {}
+        self._gauges: dict[str, Callable[[], Any]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> str:
+        if not labels:
+            return name
+        label_str = ",".join(f"{key}={value}" for key, value in sorted(labels.items()))
+        return f"{name}{{{label_str}}}"
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._summaries[key] = Summary()
+        summary.observe(value)
+
+    def register_gauge(self, name: str, getter: Callable[[], Any]):
+        self._gauges[name] = getter
+
+    def snapshot(self) -> dict:
+        gauges = {}
+        for name, getter in self._gauges.items():
+            try:
+                gauges[name] = getter()
+            except Exception as e:
+                gauges[name] = {"error": str(e)}
+
+        return {
+            "counters": dict(self._counters),
+            "summaries": {key: summary.as_dict() for key, summary in self._summaries.items()},
+            "gauges": gauges,
+        }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from src.worklog.rules.permissions import require_permission
+from src.worklog.auth.dependencies import CurrentUser
+from .service import metrics
+
+router = APIRouter(prefix="/api/v1/metrics", tags=["📈METRICS - worker-metrics"])
+
+
+@router.get("/", response_model=dict)
+async def get_metrics(current_user: CurrentUser = Depends(require_permission("get_metrics"))):
+    return metrics.snapshot()
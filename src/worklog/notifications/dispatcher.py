@@ -0,0 +1,352 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import String, and_, cast, exists, extract, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+from src.worklog.ai.whatsapp_handler import whatsapp
+from src.worklog.auth.models import Users
+from src.worklog.config.config import settings
+from src.worklog.db.core import async_session_factory
+from src.worklog.metrics.service import metrics
+from .models import NotificationOutbox, NotificationPriority
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def recipient_key(outbox):
+    """Получатель строки outbox: пользователь, а если его нет - чат"""
+    return func.coalesce(cast(outbox.user_id, String), outbox.chat_id)
+
+
+RECIPIENT_KEY = recipient_key(NotificationOutbox)
+
+
+def build_digest(messages: list[str]) -> str:
+    items = "\n\n".join(f"{number}. {message}" for number, message in enumerate(messages, start=1))
+    return f"У вас {len(messages)} новых уведомлений:\n\n{items}"
+
+
+class OutboxDispatcher:
+    """
+    Фоновая отправка строк notification_outbox. Строки забираются пачкой
+    через FOR UPDATE SKIP LOCKED и помечаются sending на время аренды,
+    поэтому несколько воркеров не отправят одно сообщение дважды.
+    Сеть трогается уже после коммита, соединение с БД на это время не держится.
+    Сообщения одному получателю объединяются в дайджест. Отправки идут
+    по приоритету через общий TokenBucket канала; получатель, исчерпавший
+    свой bucket, откладывается без траты попытки. Ответы ассистента (REPLY)
+    лимит получателя не тратят и уходят строго по одному в порядке id.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        concurrency: int,
+        poll_interval: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        lease_seconds: float,
+        digest_max_items: int,
+        rate_limit: TokenBucket,
+        recipient_rate: float,
+        recipient_burst: int,
+        stats_interval: float,
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.digest_max_items = digest_max_items
+        self.rate_limit = rate_limit
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.stats_interval = stats_interval
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._recipient_buckets: dict[str, TokenBucket] = {}
+        self._stats: dict = {}
+        self._stats_updated = 0.0
+
+        metrics.register_gauge("outbox.queue", lambda: self._stats)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Разбудить диспетчер сразу после коммита, не дожидаясь опроса"""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                claimed = 0
+
+            if time.monotonic() - self._stats_updated >= self.stats_interval:
+                try:
+                    await self.refresh_stats()
+                except Exception:
+                    logger.exception("Outbox stats refresh failed")
+                self._stats_updated = time.monotonic()
+
+            # Полная пачка - в очереди, скорее всего, есть ещё
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def backoff(self, attempts: int) -> float:
+        # Случайная добавка разносит повторы, чтобы после сбоя шлюза они не шли одной волной
+        delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+        return random.uniform(delay / 2, delay)
+
+    def _recipient_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._recipient_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._recipient_buckets) > 10000:
+                self._recipient_buckets = {key: value for key, value in self._recipient_buckets.items() if not value.idle}
+            bucket = self._recipient_buckets[chat_id] = TokenBucket(self.recipient_rate, self.recipient_burst)
+        return bucket
+
+    async def refresh_stats(self):
+        """Глубина и задержка очереди по классам приоритета для /metrics"""
+        ready = NotificationOutbox.next_attempt_at <= func.now()
+        query = (
+            select(
+                NotificationOutbox.priority,
+                func.count().label("depth"),
+                func.count().filter(ready).label("ready"),
+                extract("epoch", func.now() - func.min(NotificationOutbox.next_attempt_at).filter(ready)).label("lag"),
+            )
+            .where(NotificationOutbox.status.in_(("pending", "sending")))
+            .group_by(NotificationOutbox.priority)
+        )
+        dead_query = select(func.count()).where(NotificationOutbox.status == "dead")
+        async with async_session_factory() as session:
+            rows = (await session.execute(query)).all()
+            dead = (await session.execute(dead_query)).scalar()
+
+        stats = {"dead": dead}
+        for priority in NotificationPriority:
+            stats[priority.name.lower()] = {"depth": 0, "ready": 0, "lag_seconds": 0.0}
+        for row in rows:
+            name = NotificationPriority(row.priority).name.lower()
+            stats[name] = {"depth": row.depth, "ready": row.ready, "lag_seconds": round(float(row.lag or 0), 3)}
+        self._stats = stats
+
+    async def _claim(self) -> list:
+        ready = and_(
+            NotificationOutbox.status.in_(("pending", "sending")),
+            NotificationOutbox.next_attempt_at <= func.now(),
+        )
+        # Как только у получателя готово хотя бы одно сообщение, вместе с ним
+        # забираются и остальные его свежие сообщения - они уйдут одним дайджестом
+        ready_recipients = select(RECIPIENT_KEY).where(ready, NotificationOutbox.coalescible.is_(True))
+        joins_digest = and_(
+            NotificationOutbox.status == "pending",
+            NotificationOutbox.attempts == 0,
+            NotificationOutbox.coalescible.is_(True),
+            RECIPIENT_KEY.in_(ready_recipients),
+        )
+        # Ответ забирается, только когда более ранних неотправленных ответов
+        # этому получателю нет, - так они не обгоняют друг друга даже между воркерами
+        earlier = aliased(NotificationOutbox)
+        earlier_reply = exists().where(
+            earlier.priority == int(NotificationPriority.REPLY),
+            earlier.status.in_(("pending", "sending")),
+            earlier.id < NotificationOutbox.id,
+            recipient_key(earlier) == RECIPIENT_KEY,
+        )
+        in_order = or_(NotificationOutbox.priority != int(NotificationPriority.REPLY), ~earlier_reply)
+        claimable = (
+            select(NotificationOutbox.id)
+            .where(or_(and_(ready, in_order), joins_digest))
+            .order_by(NotificationOutbox.priority, NotificationOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claim = (
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(claimable.scalar_subquery()))
+            .values(
+                status="sending",
+                attempts=NotificationOutbox.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=self.lease_seconds),
+            )
+            .execution_options(synchronize_session=False)
+            .returning(
+                NotificationOutbox.id,
+                NotificationOutbox.user_id,
+                NotificationOutbox.chat_id,
+                NotificationOutbox.message,
+                NotificationOutbox.coalescible,
+                NotificationOutbox.priority,
+                NotificationOutbox.attempts,
+            )
+        )
+        async with async_session_factory() as session:
+            rows = (await session.execute(claim)).all()
+            # Получатели без chat_id подставляются одним запросом на пачку
+            user_ids = {row.user_id for row in rows if not row.chat_id and row.user_id}
+            chats = {}
+            if user_ids:
+                result = await session.execute(
+                    select(Users.id, Users.chat_id_whatsapp).where(Users.id.in_(user_ids))
+                )
+                chats = dict(result.all())
+            await session.commit()
+        return [(row, row.chat_id or chats.get(row.user_id)) for row in sorted(rows, key=lambda row: (row.priority, row.id))]
+
+    def _deliveries(self, claimed: list) -> list[tuple[list, Optional[str], str]]:
+        """Группирует строки в отправки: (строки, chat_id, текст)"""
+        groups: dict = {}
+        deliveries = []
+        for row, chat_id in claimed:
+            if row.coalescible:
+                groups.setdefault(chat_id or f"user:{row.user_id}", []).append((row, chat_id))
+            else:
+                deliveries.append(([row], chat_id, row.message))
+
+        for items in groups.values():
+            chat_id = items[0][1]
+            for start in range(0, len(items), self.digest_max_items):
+                rows = [row for row, _ in items[start:start + self.digest_max_items]]
+                if len(rows) == 1:
+                    deliveries.append((rows, chat_id, rows[0].message))
+                else:
+                    deliveries.append((rows, chat_id, build_digest([row.message for row in rows])))
+                    metrics.inc("outbox.digests")
+                    metrics.inc("outbox.coalesced", len(rows))
+        # Дайджест уходит с приоритетом самого важного сообщения в нём
+        deliveries.sort(key=lambda delivery: min(row.priority for row in delivery[0]))
+        return deliveries
+
+    async def _send(self, chat_id: Optional[str], body: str) -> Optional[str]:
+        """None - отправлено, иначе текст ошибки"""
+        if not chat_id:
+            return "recipient has no whatsapp chat"
+        async with self._semaphore:
+            await self.rate_limit.acquire()
+            try:
+                await whatsapp.send_message(body, chat_id, raise_for_status=True)
+                return None
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+
+    async def dispatch_once(self) -> int:
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+
+        deliveries = []
+        deferred = []
+        replies = 0
+        for rows, chat_id, body in self._deliveries(claimed):
+            if rows[0].priority == NotificationPriority.REPLY:
+                replies += 1
+                deliveries.append((rows, chat_id, body))
+                continue
+            wait = self._recipient_bucket(chat_id).try_acquire() if chat_id else 0
+            if wait:
+                deferred.append((rows, wait))
+            else:
+                deliveries.append((rows, chat_id, body))
+
+        # Задачи стартуют в порядке приоритета и в том же порядке получают токены канала
+        errors = await asyncio.gather(*(self._send(chat_id, body) for _, chat_id, body in deliveries))
+
+        sent_ids = []
+        failed = []
+        for (rows, chat_id, _), error in zip(deliveries, errors):
+            if error is None:
+                sent_ids.extend(row.id for row in rows)
+            else:
+                failed.extend((row, chat_id, error) for row in rows)
+
+        async with async_session_factory() as session:
+            if sent_ids:
+                await session.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_(sent_ids))
+                    .values(status="sent", sent_at=func.now(), last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for rows, wait in deferred:
+                # Отложенная отправка не считается попыткой
+                await session.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_([row.id for row in rows]))
+                    .values(
+                        status="pending",
+                        attempts=NotificationOutbox.attempts - 1,
+                        next_attempt_at=func.now() + timedelta(seconds=wait),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                metrics.inc("outbox.deferred", len(rows))
+            for row, chat_id, error in failed:
+                # Без chat_id повтор не поможет
+                if row.attempts >= self.max_attempts or not chat_id:
+                    values = {"status": "dead"}
+                    metrics.inc("outbox.dead")
+                else:
+                    delay = timedelta(seconds=self.backoff(row.attempts))
+                    values = {"status": "pending", "next_attempt_at": func.now() + delay}
+                    metrics.inc("outbox.retried")
+                await session.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id == row.id)
+                    .values(last_error=error[:1000], **values)
+                    .execution_options(synchronize_session=False)
+                )
+                logger.warning("Outbox message %s failed (attempt %s): %s", row.id, row.attempts, error)
+            await session.commit()
+
+        metrics.inc("outbox.sent", len(sent_ids))
+        # Следующий ответ тому же получателю мог ждать этот - забираем его сразу
+        if replies:
+            self.wake()
+        return len(claimed)
+
+
+dispatcher = OutboxDispatcher(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    concurrency=settings.OUTBOX_CONCURRENCY,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    backoff_base=settings.OUTBOX_BACKOFF_BASE,
+    backoff_max=settings.OUTBOX_BACKOFF_MAX,
+    lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+    digest_max_items=settings.NOTIFY_DIGEST_MAX_ITEMS,
+    rate_limit=TokenBucket(settings.NOTIFY_WHATSAPP_RATE, settings.NOTIFY_WHATSAPP_BURST),
+    recipient_rate=settings.NOTIFY_RECIPIENT_RATE,
+    recipient_burst=settings.NOTIFY_RECIPIENT_BURST,
+    stats_interval=settings.OUTBOX_STATS_INTERVAL,
+)
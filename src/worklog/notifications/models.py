@@ -1,7 +1,8 @@
 from src.worklog.db.core import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Text, Boolean, DateTime, func
+from sqlalchemy import String, Integer, SmallInteger, Text, Boolean, DateTime, func, Index
 from datetime import datetime
+from enum import IntEnum
 
 
 class Notifications(Base):
@@ -9,10 +10,45 @@ class Notifications(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
-    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
 
     essence: Mapped[str] = mapped_column(String(255), nullable=False)
     task_id: Mapped[int] = mapped_column(Integer, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class NotificationPriority(IntEnum):
+    """Класс исходящего сообщения: чем меньше, тем раньше уходит"""
+    # Ответы ассистента: вне лимита получателя и строго по порядку
+    REPLY = -1
+    ASSIGNMENT = 0
+    REMINDER = 1
+    INFORMATIONAL = 2
+
+
+class NotificationOutbox(Base):
+    """Исходящие сообщения: пишутся в транзакции запроса, отправляются диспетчером"""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        Index('ix_notification_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    user_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    chat_id: Mapped[str] = mapped_column(String(255), nullable=True)
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+    # Можно объединить с другими сообщениями получателю в один дайджест
+    coalescible: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default='true')
+    priority: Mapped[int] = mapped_column(SmallInteger, nullable=False, server_default=str(int(NotificationPriority.INFORMATIONAL)))
+
+    # pending -> sending -> sent | dead; dead - исчерпаны попытки, строка остаётся для разбора
+    status: Mapped[str] = mapped_column(String(20), nullable=False, server_default='pending')
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default='0')
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
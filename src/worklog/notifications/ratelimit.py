@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Ограничение частоты: rate токенов в секунду, не больше burst подряд. rate <= 0 - без ограничения"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    async def acquire(self):
+        if self.unlimited:
+            return
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def try_acquire(self) -> float:
+        """Взять токен без ожидания: 0 - взят, иначе через сколько секунд появится"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        return 0.0
+
+    @property
+    def idle(self) -> bool:
+        if self.unlimited:
+            return True
+        self._refill()
+        return self._tokens >= self.burst
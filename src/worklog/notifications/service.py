@@ -1,38 +1,56 @@
-from .models import Notifications
+from .models import Notifications, NotificationOutbox, NotificationPriority
+from .dispatcher import dispatcher
 from .schemas import *
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, func
+from datetime import timedelta
+from src.worklog.config.config import settings
 from typing import List
-from src.worklog.auth.models import Users
-from src.worklog.queue.service import RabbitMQPublisher
-from src.worklog.ai.whatsapp_handler import WhatsappHandler
+from src.worklog.queue.service import publisher
 
 class NotificationService:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.rabbitmq_publisher = RabbitMQPublisher()
-        self.whatsapp_handler = WhatsappHandler()
+        self.rabbitmq_publisher = publisher
     
+    def enqueue_whatsapp(
+        self,
+        message: str,
+        user_id: int = None,
+        chat_id: str = None,
+        coalesce: bool = True,
+        priority: NotificationPriority = NotificationPriority.INFORMATIONAL,
+    ) -> NotificationOutbox:
+        """
+        Кладёт сообщение в outbox в текущей транзакции. Отправит его
+        диспетчер после коммита; после commit() стоит вызвать dispatcher.wake().
+        При coalesce сообщение ждёт NOTIFY_COALESCE_WINDOW секунд, чтобы уйти
+        одним дайджестом с другими сообщениями этому получателю.
+        """
+        outbox = NotificationOutbox(
+            user_id=user_id,
+            chat_id=chat_id,
+            message=message,
+            coalescible=coalesce,
+            priority=int(priority),
+        )
+        if coalesce and settings.NOTIFY_COALESCE_WINDOW > 0:
+            outbox.next_attempt_at = func.now() + timedelta(seconds=settings.NOTIFY_COALESCE_WINDOW)
+        self.db.add(outbox)
+        return outbox
+
     async def create_notification(self, user_id: int, essence: str, task_id: int = None):
         notification = Notifications(
             user_id=user_id,
             essence=essence,
             task_id=task_id
         )
-        self.send_notification(user_id, essence)
         self.db.add(notification)
+        self.enqueue_whatsapp(essence, user_id=user_id)
         await self.db.commit()
-        self.rabbitmq_publisher.send({
+        dispatcher.wake()
+        await self.rabbitmq_publisher.send({
             "user_id": user_id,
             "message": notification.id
         })
         return notification
-
-    async def send_notification(self, user_id: int, message: str):
-        userDB = await self.db.execute(select(Users).where(Users.id == user_id))
-        user = userDB.scalars().first()
-        if user:
-            await self.whatsapp_handler.send_message(user.chat_id_whatsapp, message)
-        else:
-            raise HTTPException(status_code=404, detail="User not found")
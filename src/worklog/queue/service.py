@@ -1,20 +1,128 @@
-import pika
+import asyncio
 import json
+import logging
+from typing import Optional
+
+import aio_pika
+from aio_pika.abc import AbstractRobustConnection
+from aio_pika.pool import Pool
+
+from src.worklog.config.config import settings
+from src.worklog.metrics.service import metrics
+
+logger = logging.getLogger(__name__)
+
 
 class RabbitMQPublisher:
-    def __init__(self, host='rabbitmq', queue='chat_queue', user='user', password='password'):
+    """
+    Асинхронный издатель, один на воркер. Соединение robust (само
+    переподключается), каналы берутся из пула и работают в режиме
+    publisher confirms. При batch_size > 1 сообщения копятся и уходят
+    пачкой по заполнению или через batch_delay секунд.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        queue: str,
+        channel_pool_size: int = 4,
+        batch_size: int = 1,
+        batch_delay: float = 0.05,
+        connect_timeout: float = 5,
+    ):
+        self.url = url
         self.queue = queue
-        credentials = pika.PlainCredentials(user, password)
-        parameters = pika.ConnectionParameters(host=host, credentials=credentials)
-        self.connection = pika.BlockingConnection(parameters)
-        self.channel = self.connection.channel()
-        self.channel.queue_declare(queue=self.queue)
+        self.channel_pool_size = channel_pool_size
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.connect_timeout = connect_timeout
+
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channels: Optional[Pool] = None
+        self._connect_lock = asyncio.Lock()
+        self._buffer: list[bytes] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Вызывается из lifespan; недоступный брокер не мешает старту приложения"""
+        try:
+            await self._ensure_connection()
+        except Exception as e:
+            logger.warning("RabbitMQ is unavailable, will retry on first publish: %s", e)
+
+    async def close(self):
+        if self._buffer:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to flush RabbitMQ buffer on shutdown: %s", e)
+        if self._channels is not None:
+            await self._channels.close()
+            self._channels = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _ensure_connection(self):
+        if self._channels is not None:
+            return
+        async with self._connect_lock:
+            if self._channels is not None:
+                return
+            self._connection = await aio_pika.connect_robust(self.url, timeout=self.connect_timeout)
+            self._channels = Pool(self._open_channel, max_size=self.channel_pool_size)
 
-    def send(self, payload: dict):
+            # Очередь объявляется один раз на соединение, а не на каждое сообщение
+            async with self._channels.acquire() as channel:
+                await channel.declare_queue(self.queue)
+
+    async def _open_channel(self) -> aio_pika.abc.AbstractChannel:
+        return await self._connection.channel(publisher_confirms=True)
+
+    async def send(self, payload: dict):
         body = json.dumps(payload).encode()
-        self.channel.basic_publish(
-            exchange='',
-            routing_key=self.queue,
-            body=body
-        )
-        print(f"📤 Sent: {payload}")
+        if self.batch_size <= 1:
+            await self._publish([body])
+            return
+
+        self._buffer.append(body)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def flush(self):
+        bodies, self._buffer = self._buffer, []
+        if bodies:
+            await self._publish(bodies)
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.batch_delay)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Failed to publish RabbitMQ batch: %s", e)
+
+    async def _publish(self, bodies: list[bytes]):
+        try:
+            await self._ensure_connection()
+            async with self._channels.acquire() as channel:
+                # Подтверждения по всем сообщениям пачки ждём одновременно
+                await asyncio.gather(*(
+                    channel.default_exchange.publish(aio_pika.Message(body=body), routing_key=self.queue)
+                    for body in bodies
+                ))
+        except Exception:
+            metrics.inc("rabbitmq.publish_errors", len(bodies), queue=self.queue)
+            raise
+        metrics.inc("rabbitmq.published", len(bodies), queue=self.queue)
+
+
+publisher = RabbitMQPublisher(
+    url=settings.RABBITMQ_URL,
+    queue=settings.RABBITMQ_QUEUE,
+    channel_pool_size=settings.RABBITMQ_CHANNEL_POOL_SIZE,
+    batch_size=settings.RABBITMQ_BATCH_SIZE,
+    batch_delay=settings.RABBITMQ_BATCH_DELAY_MS / 1000,
+    connect_timeout=settings.RABBITMQ_CONNECT_TIMEOUT,
+)
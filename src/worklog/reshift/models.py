@@ -9,8 +9,8 @@ class ReshiftUsers(Base):
 
     id: Mapped[int] = Column(Integer, primary_key=True)
 
-    first_user_id: Mapped[int] = Column(Integer, nullable=False)
-    second_user_id: Mapped[int] = Column(Integer, nullable=False)
+    first_user_id: Mapped[int] = Column(Integer, nullable=False, index=True)
+    second_user_id: Mapped[int] = Column(Integer, nullable=False, index=True)
 
     created_at: Mapped[datetime] = Column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = Column(DateTime, server_default=func.now(), server_onupdate=func.now())
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -33,4 +33,6 @@ class ReportResponse(BaseModel):
 
 class ReportListResponse(BaseModel):
     reports: List[ReportResponse]
-    total: int = Field(...)
\ No newline at end of file
+    total: int = Field(...)
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
@@ -5,7 +5,11 @@ from src.worklog.reshift.models import *
 from src.worklog.reshift.schemas import *
 from src.worklog.auth.models import Users
 from sqlalchemy import or_, and_
-from src.worklog.tasks.models import TaskAssignees
+from src.worklog.tasks.models import TaskAssignees, Tasks
+from src.worklog.notifications.service import NotificationService
+from src.worklog.notifications.models import NotificationPriority
+from src.worklog.notifications.dispatcher import dispatcher as outbox_dispatcher
+from src.worklog.db.pagination import PageParams, paginate
 
 
 class ReShiftService:
@@ -87,7 +91,7 @@ class ReShiftService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def get_user_reports(self, user_id: int) -> ReportListResponse:
+    async def get_user_reports(self, user_id: int, page: PageParams = None) -> ReportListResponse:
         # Получаем данные о пользователе
         user_db = await self.db.execute(select(Users).where(Users.id == user_id))
         user_main = user_db.scalars().first()
@@ -117,15 +121,13 @@ class ReShiftService:
         if second_user_id:
             user_ids.append(second_user_id)
 
-        # Получаем пользователей для отчётов
-        users_query = await self.db.execute(select(Users).where(Users.id.in_(user_ids)))
-        users_map = {user.id: user for user in users_query.scalars().all()}
-
-        # Получаем отчёты по обоим пользователям
-        reports_query = await self.db.execute(
-            select(Reshifts).where(Reshifts.user_id.in_(user_ids)).order_by(Reshifts.id.desc())
+        # Отчёты по обоим пользователям вместе с авторами, новые сначала
+        query = (
+            select(Reshifts, Users)
+            .join(Users, Users.id == Reshifts.user_id)
+            .where(Reshifts.user_id.in_(user_ids))
         )
-        reports = reports_query.scalars().all()
+        page = await paginate(self.db, query, (Reshifts.id,), page or PageParams(), descending=True)
 
         # Собираем результат
         return ReportListResponse(
@@ -135,17 +137,19 @@ class ReShiftService:
                     done=report.done,
                     todo=report.todo,
                     user=User(
-                        id=report.user_id,
-                        first_name=users_map[report.user_id].first_name,
-                        last_name=users_map[report.user_id].last_name,
-                        middle_name=users_map[report.user_id].middle_name,
-                        position=users_map[report.user_id].position,
+                        id=user.id,
+                        first_name=user.first_name,
+                        last_name=user.last_name,
+                        middle_name=user.middle_name,
+                        position=user.position,
                     ),
                     created_at=report.created_at,
                 )
-                for report in reports
+                for report, user in page.rows
             ],
-            total=len(reports)
+            total=len(page.rows),
+            next_cursor=page.next_cursor,
+            estimated_total=page.estimated_total
         )
 
     async def sign_user_shift_task(self, user_id: int):
@@ -169,11 +173,13 @@ class ReShiftService:
             else existing_shift.first_user_id
         )
 
-        # Получаем задачи текущего пользователя
+        # Получаем задачи текущего пользователя вместе с названиями
         main_user_tasks = await self.db.execute(
-            select(TaskAssignees).where(TaskAssignees.user_id == user_id)
+            select(TaskAssignees.task_id, Tasks.title)
+            .join(Tasks, Tasks.id == TaskAssignees.task_id)
+            .where(TaskAssignees.user_id == user_id)
         )
-        tasks = main_user_tasks.scalars().all()
+        tasks = main_user_tasks.all()
 
         # Получаем все уже назначенные задачи второго пользователя
         existing_assignees_result = await self.db.execute(
@@ -181,7 +187,10 @@ class ReShiftService:
         )
         existing_task_ids = set(existing_assignees_result.scalars().all())
 
-        # Добавляем только те, которых ещё нет
+        # Добавляем только те, которых ещё нет. Уведомления уходят через outbox
+        # и при массовой передаче приходят второму пользователю одним дайджестом
+        notifications = NotificationService(self.db)
+        added = False
         for task in tasks:
             if task.task_id not in existing_task_ids:
                 new_assignee = TaskAssignees(
@@ -189,6 +198,14 @@ class ReShiftService:
                     task_id=task.task_id,
                 )
                 self.db.add(new_assignee)
+                notifications.enqueue_whatsapp(
+                    f"Вам передана задача '{task.title}'",
+                    user_id=second_user_id,
+                    priority=NotificationPriority.ASSIGNMENT,
+                )
+                added = True
 
         await self.db.commit()
+        if added:
+            outbox_dispatcher.wake()
         return True
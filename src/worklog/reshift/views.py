@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from .schemas import *
 from .service import *
 from src.worklog.db.core import get_db
+from src.worklog.db.pagination import PageParams
 from src.worklog.config.auth import auth
 
 router = APIRouter(prefix="/api/v1/reshifts", tags=["RESHIFT"])
@@ -13,9 +14,9 @@ async def new_report_reshift(data: ReshiftCreate, db: AsyncSession = Depends(get
     return data
 
 @router.get('/my', response_model=ReportListResponse)
-async def my_report(db: AsyncSession = Depends(get_db), current_user = Depends(auth.get_user_data_dependency())):
+async def my_report(page: PageParams = Depends(), db: AsyncSession = Depends(get_db), current_user = Depends(auth.get_user_data_dependency())):
     service = ReShiftService(db)
-    data = await service.get_user_reports(user_id=int(current_user['sub']))
+    data = await service.get_user_reports(user_id=int(current_user['sub']), page=page)
     return data
 
 @router.post('/register/user/shift')
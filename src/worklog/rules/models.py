@@ -1,6 +1,6 @@
 from src.worklog.db.core import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Boolean, DateTime, func
+from sqlalchemy import String, Integer, Boolean, DateTime, func, Index
 from datetime import datetime
 
 
@@ -31,6 +31,9 @@ class Permissions(Base):
 
 class RolePermissions(Base):
     __tablename__ = 'role_permissions'
+    __table_args__ = (
+        Index('uq_role_permissions_role_id_permission_id', 'role_id', 'permission_id', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
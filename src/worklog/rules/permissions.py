@@ -1,70 +1,171 @@
 from .models import *
-from sqlalchemy import select, and_, or_
-from fastapi import HTTPException
+import asyncio
+import time
+from typing import NamedTuple, Optional
+from sqlalchemy import select
+from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.worklog.auth.models import Users
-from functools import lru_cache
-from typing import Optional
+from src.worklog.auth.dependencies import CurrentUser, get_current_user
+from src.worklog.config.config import settings
+from src.worklog.db.core import get_db
+
+
+class UserGrantInfo(NamedTuple):
+    role: int
+    department_id: int
+    is_superuser: bool
+
+
+class PermissionSnapshot:
+    """Неизменяемый снимок RBAC: права по имени, по ролям, отделам и пользователям"""
+
+    def __init__(
+        self,
+        generation: int,
+        permissions_by_name: dict[str, int],
+        role_permissions: dict[int, frozenset[int]],
+        department_permissions: dict[int, frozenset[int]],
+        user_permissions: dict[int, frozenset[int]],
+        users: dict[int, UserGrantInfo],
+    ):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.permissions_by_name = permissions_by_name
+        self.role_permissions = role_permissions
+        self.department_permissions = department_permissions
+        self.user_permissions = user_permissions
+        self.users = users
+
+    def has_permission(self, user_id: int, user: UserGrantInfo, permission: str) -> bool:
+        if user.is_superuser:
+            return True
+
+        permission_id = self.permissions_by_name.get(permission)
+        if permission_id is None:
+            return False
+
+        return (
+            permission_id in self.role_permissions.get(user.role, ())
+            or permission_id in self.department_permissions.get(user.department_id, ())
+            or permission_id in self.user_permissions.get(user_id, ())
+        )
+
+
+def _group(rows) -> dict[int, frozenset[int]]:
+    grouped: dict[int, set[int]] = {}
+    for owner_id, permission_id in rows:
+        grouped.setdefault(owner_id, set()).add(permission_id)
+    return {owner_id: frozenset(ids) for owner_id, ids in grouped.items()}
+
+
+class PermissionCache:
+    """
+    Общий для воркера кэш RBAC. Снимок пересобирается целиком и подменяется
+    одной операцией присваивания. invalidate() вызывается после изменения
+    прав в этом воркере; остальные воркеры подхватят изменения через TTL.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot: Optional[PermissionSnapshot] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._generation += 1
+
+    def _is_fresh(self, snapshot: Optional[PermissionSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.generation == self._generation
+            and time.monotonic() - snapshot.built_at < self.ttl
+        )
+
+    async def get(self, db: AsyncSession) -> PermissionSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        async with self._lock:
+            if not self._is_fresh(self._snapshot):
+                self._snapshot = await self._build(db)
+            return self._snapshot
+
+    async def _build(self, db: AsyncSession) -> PermissionSnapshot:
+        generation = self._generation
+
+        permissions = await db.execute(select(Permissions.name, Permissions.id))
+        roles = await db.execute(select(RolePermissions.role_id, RolePermissions.permission_id))
+        departments = await db.execute(
+            select(DepartmentPermissions.department_id, DepartmentPermissions.permission_id)
+        )
+        user_grants = await db.execute(select(UserPermissions.user_id, UserPermissions.permission_id))
+        users = await db.execute(select(Users.id, Users.role, Users.department_id, Users.is_superuser))
+
+        return PermissionSnapshot(
+            generation=generation,
+            permissions_by_name={name: permission_id for name, permission_id in permissions.all()},
+            role_permissions=_group(roles.all()),
+            department_permissions=_group(departments.all()),
+            user_permissions=_group(user_grants.all()),
+            users={
+                user_id: UserGrantInfo(role, department_id, bool(is_superuser))
+                for user_id, role, department_id, is_superuser in users.all()
+            },
+        )
+
+
+permission_cache = PermissionCache(ttl=settings.RBAC_CACHE_TTL)
+
 
 class PermissionService:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self._permission_cache = {}
 
-    @lru_cache(maxsize=100)
-    def _get_permission_id(self, permission: str) -> Optional[int]:
-        return self._permission_cache.get(permission)
+    async def has_permission(self, user: Users, permission: str) -> bool:
+        """Проверка прав для уже загруженного пользователя, без обращений к БД при тёплом кэше"""
+        snapshot = await permission_cache.get(self.db)
+        grant_info = UserGrantInfo(user.role, user.department_id, bool(user.is_superuser))
+        return snapshot.has_permission(user.id, grant_info, permission)
 
     async def user_access_control(self, user_id: int, permission: str) -> bool:
         try:
             # Convert user_id to integer if it's a string
             user_id = int(user_id)
-            
-            # Get user with a single query
-            query = await self.db.execute(
-                select(Users).where(Users.id == user_id)
-            )
-            user = query.scalar_one_or_none()
-            
+
+            snapshot = await permission_cache.get(self.db)
+
+            user = snapshot.users.get(user_id)
             if user is None:
-                raise HTTPException(status_code=404, detail="User not found")
-                
-            if user.is_superuser:
-                return True
-            
-            
-            # Get permission ID from cache or database
-            permission_id = self._get_permission_id(permission)
-            if permission_id is None:
-                permission_query = await self.db.execute(
-                    select(Permissions).where(Permissions.name == permission)
+                # Пользователь создан после сборки снимка (например, в другом воркере)
+                query = await self.db.execute(
+                    select(Users.role, Users.department_id, Users.is_superuser).where(Users.id == user_id)
                 )
-                permission_obj = permission_query.scalar_one_or_none()
-                if permission_obj is None:
-                    return False
-                permission_id = permission_obj.id
-                self._permission_cache[permission] = permission_id
-
-            # Check all permissions in a single query
-            roles_db = await self.db.execute(select(RolePermissions).where(RolePermissions.permission_id == permission_id, RolePermissions.role_id == user.role))
-            roles = roles_db.scalars().all()
-            if roles:
-                return True
-            
-            departments_db = await self.db.execute(select(DepartmentPermissions).where(DepartmentPermissions.permission_id == permission_id, DepartmentPermissions.department_id == user.department_id))
-            departments = departments_db.scalars().all()
-            if departments:
-                return True
-            
-            user_permissions_db = await self.db.execute(select(UserPermissions).where(UserPermissions.permission_id == permission_id, UserPermissions.user_id == user_id))
-            user_permissions = user_permissions_db.scalars().all()
-            if user_permissions:
-                return True
-            
-     
-            return False
+                row = query.one_or_none()
+                if row is None:
+                    raise HTTPException(status_code=404, detail="User not found")
+                user = UserGrantInfo(row.role, row.department_id, bool(row.is_superuser))
+
+            return snapshot.has_permission(user_id, user, permission)
 
+        except HTTPException:
+            raise
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid user ID format")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def require_permission(permission: str):
+    """Зависимость FastAPI: текущий пользователь, если у него есть право permission, иначе 403"""
+
+    async def dependency(
+        current_user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db),
+    ) -> CurrentUser:
+        if not await PermissionService(db).has_permission(current_user.user, permission):
+            raise HTTPException(status_code=403, detail="Forbidden")
+        return current_user
+
+    return dependency
@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import select, delete
+from .permissions import permission_cache
 
 class RuleService:
     def __init__(self, db: AsyncSession):
@@ -21,6 +22,7 @@ class RuleService:
             )
             self.db.add(role)
             await self.db.commit()
+            permission_cache.invalidate()
             await self.db.refresh(role)
             return RoleResponse.model_validate(role, from_attributes=True)
         except SQLAlchemyError as e:
@@ -63,6 +65,7 @@ class RuleService:
             role.description = role_data.description
             
             await self.db.commit()
+            permission_cache.invalidate()
             await self.db.refresh(role)
             return RoleResponse.model_validate(role, from_attributes=True)
         except SQLAlchemyError as e:
@@ -103,6 +106,7 @@ class RuleService:
 
             await self.db.delete(role)
             await self.db.commit()
+            permission_cache.invalidate()
             return True
         except SQLAlchemyError as e:
             await self.db.rollback()
@@ -196,6 +200,7 @@ class RuleService:
             )
             self.db.add(permission)
             await self.db.commit()
+            permission_cache.invalidate()
             await self.db.refresh(permission)
             return PermissionResponse.model_validate(permission)
         except SQLAlchemyError as e:
@@ -257,6 +262,7 @@ class RuleService:
                 self.db.add(permission)
             
             await self.db.commit()
+            permission_cache.invalidate()
             for permission in permissions:
                 await self.db.refresh(permission)
             
@@ -288,7 +294,8 @@ class RuleService:
             
             # Добавляем новые права
             for role_id, permission_ids in permissions_data.items():
-                for permission_id in permission_ids:
+                # Пара (role_id, permission_id) уникальна
+                for permission_id in dict.fromkeys(permission_ids):
                     role_permission = RolePermissions(
                         role_id=int(role_id),
                         permission_id=permission_id,
@@ -297,6 +304,7 @@ class RuleService:
                     self.db.add(role_permission)
             
             await self.db.commit()
+            permission_cache.invalidate()
             return True
         except SQLAlchemyError as e:
             await self.db.rollback()
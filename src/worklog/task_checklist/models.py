@@ -8,7 +8,7 @@ class TaskChecklist(Base):
     __tablename__ = 'task_checklist'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    task_id: Mapped[int] = mapped_column(Integer)
+    task_id: Mapped[int] = mapped_column(Integer, index=True)
 
     title: Mapped[str] = mapped_column(String(255))
     description: Mapped[str] = mapped_column(Text)
@@ -23,7 +23,7 @@ class TaskChecklistItem(Base):
     __tablename__ = 'task_checklist_item'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    checklist_id: Mapped[int] = mapped_column(Integer)
+    checklist_id: Mapped[int] = mapped_column(Integer, index=True)
 
     content: Mapped[str] = mapped_column(String(255))
     is_checked: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -3,8 +3,8 @@ from .schemas import *
 from .service import TaskChecklistService
 from src.worklog.db.core import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.worklog.rules.permissions import PermissionService
-from src.worklog.config.auth import auth
+from src.worklog.rules.permissions import require_permission
+from src.worklog.auth.dependencies import CurrentUser
 
 
 router = APIRouter(prefix="/api/v1/task-checklist", tags=["🔍TASK CHECKLIST - task-checklist-manager"])
@@ -17,26 +17,20 @@ router = APIRouter(prefix="/api/v1/task-checklist", tags=["🔍TASK CHECKLIST -
 async def create_checklist(
     task_id: int,
     checklist: CreateCheckList, 
-    current_user: dict = Depends(auth.get_user_data_dependency()), 
+    current_user: CurrentUser = Depends(require_permission("create_checklist")), 
     db: AsyncSession = Depends(get_db)
 ):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "create_checklist"):
-        raise HTTPException(status_code=403, detail="Forbidden")
     checklist_service = TaskChecklistService(db)
-    return await checklist_service.create_checklist(checklist, int(current_user["sub"]), task_id)
+    return await checklist_service.create_checklist(checklist, current_user.id, task_id)
 
 @router.get("/task/{task_id}", response_model=TaskChecklistListResponse,
             summary="Get all checklists for a task",
             description="Retrieves all checklists associated with a specific task, including their items.")
 async def get_task_checklists(
     task_id: int,
-    current_user: dict = Depends(auth.get_user_data_dependency()), 
+    current_user: CurrentUser = Depends(require_permission("get_task_checklists")), 
     db: AsyncSession = Depends(get_db)
 ):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "get_task_checklists"):
-        raise HTTPException(status_code=403, detail="Forbidden")
     checklist_service = TaskChecklistService(db)
     return await checklist_service.get_task_checklists(task_id)
 
@@ -45,12 +39,9 @@ async def get_task_checklists(
             description="Retrieves a specific checklist by its ID, including all its items.")
 async def get_checklist(
     checklist_id: int, 
-    current_user: dict = Depends(auth.get_user_data_dependency()), 
+    current_user: CurrentUser = Depends(require_permission("get_checklist")), 
     db: AsyncSession = Depends(get_db)
 ):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "get_checklist"):
-        raise HTTPException(status_code=403, detail="Forbidden")
     checklist_service = TaskChecklistService(db)
     return await checklist_service.get_checklist_by_id(checklist_id)
 
@@ -65,12 +56,9 @@ async def update_checklist(data: UpdateCheckList, checklist_id: int, db: AsyncSe
 async def create_checklist_item(
     checklist_id: int, 
     item: CreateCheckListItem, 
-    current_user: dict = Depends(auth.get_user_data_dependency()), 
+    current_user: CurrentUser = Depends(require_permission("create_checklist_item")), 
     db: AsyncSession = Depends(get_db)
 ):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "create_checklist_item"):
-        raise HTTPException(status_code=403, detail="Forbidden")
     checklist_service = TaskChecklistService(db)
     return await checklist_service.create_checklist_item(checklist_id, item)
 
@@ -81,14 +69,11 @@ async def update_checklist_item(
     checklist_id: int, 
     item_id: int, 
     is_checked: bool, 
-    current_user: dict = Depends(auth.get_user_data_dependency()), 
+    current_user: CurrentUser = Depends(require_permission("update_checklist_item")), 
     db: AsyncSession = Depends(get_db)
 ):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "update_checklist_item"):
-        raise HTTPException(status_code=403, detail="Forbidden")
     checklist_service = TaskChecklistService(db)
-    return await checklist_service.update_checklist_item(int(current_user["sub"]), checklist_id, item_id, is_checked)
+    return await checklist_service.update_checklist_item(current_user.id, checklist_id, item_id, is_checked)
 
 
 @router.delete('/checklists/{checklist_item_id}')
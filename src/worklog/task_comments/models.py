@@ -8,7 +8,7 @@ class TaskComments(Base):
     __tablename__ = 'task_comments'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    task_id: Mapped[int] = mapped_column(Integer)
+    task_id: Mapped[int] = mapped_column(Integer, index=True)
 
     content: Mapped[str] = mapped_column(Text)
     user_id: Mapped[int] = mapped_column(Integer)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
 
 
 class UserData(BaseModel):
@@ -19,7 +20,9 @@ class TaskCommentResponse(BaseModel):
 
 class TaskCommentListResponse(BaseModel):
     comments: list[TaskCommentResponse] = Field(..., description="The list of task comments")
-    total: int = Field(..., description="The total number of task comments")
+    total: int = Field(..., description="The number of task comments on this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page")
+    estimated_total: Optional[int] = Field(None, description="Planner estimate of the total number of task comments")
 
 class CreateTaskComment(BaseModel):
     content: str = Field(..., description="The content of the task comment")
\ No newline at end of file
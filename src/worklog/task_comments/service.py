@@ -3,6 +3,7 @@ from .schemas import *
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from src.worklog.auth.models import Users
+from src.worklog.db.pagination import PageParams, paginate
 
 class TaskCommentService:
     def __init__(self, db: AsyncSession):
@@ -29,41 +30,33 @@ class TaskCommentService:
             await self.db.rollback()
             raise e
 
-    async def get_task_comments(self, task_id: int) -> TaskCommentListResponse:
+    async def get_task_comments(self, task_id: int, page: PageParams = None) -> TaskCommentListResponse:
         try:
-            comments_result = await self.db.execute(
-                select(TaskComments).where(TaskComments.task_id == task_id)
+            # Автор подгружается вместе с каждым комментарием
+            query = (
+                select(TaskComments, Users)
+                .join(Users, Users.id == TaskComments.user_id)
+                .where(TaskComments.task_id == task_id)
             )
-            comments_list = comments_result.scalars().all()
-            
-            # If there are no comments, return an empty list
-            if not comments_list:
-                return TaskCommentListResponse(
-                    comments=[],
-                    total=0
-                )
-                
-            # Get user data for the first comment
-            user_db = await self.db.execute(
-                select(Users).where(Users.id == comments_list[0].user_id)
-            )
-            user_list = user_db.scalars().first()
-            
+            page = await paginate(self.db, query, (TaskComments.id,), page or PageParams())
+
             return TaskCommentListResponse(
                 comments=[TaskCommentResponse(
                     id=comment.id,
                     content=comment.content,
                     user=UserData(
-                        id=user_list.id,
-                        first_name=user_list.first_name,
-                        last_name=user_list.last_name,
-                        middle_name=user_list.middle_name,
-                        position=user_list.position
+                        id=user.id,
+                        first_name=user.first_name,
+                        last_name=user.last_name,
+                        middle_name=user.middle_name,
+                        position=user.position
                     ),
                     created_at=comment.created_at,
                     updated_at=comment.updated_at
-                ) for comment in comments_list],
-                total=len(comments_list)
+                ) for comment, user in page.rows],
+                total=len(page.rows),
+                next_cursor=page.next_cursor,
+                estimated_total=page.estimated_total
             )
         except Exception as e:
             await self.db.rollback()
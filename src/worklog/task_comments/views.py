@@ -2,26 +2,21 @@ from fastapi import APIRouter, Depends, HTTPException
 from .schemas import *
 from .service import *
 from src.worklog.db.core import get_db
+from src.worklog.db.pagination import PageParams
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.worklog.config.auth import auth
-from src.worklog.rules.permissions import PermissionService
+from src.worklog.rules.permissions import require_permission
+from src.worklog.auth.dependencies import CurrentUser
 
 
 router = APIRouter(prefix="/api/v1/task-comments", tags=["💬TASK COMMENTS - task-comment-manager"])
 #TODO: ADD PERMISSION CHECKS
 
 @router.post("/", response_model=TaskCommentResponse)
-async def create_task_comment(task_id: int, comment: CreateTaskComment, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "create_task_comment"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def create_task_comment(task_id: int, comment: CreateTaskComment, current_user: CurrentUser = Depends(require_permission("create_task_comment")), db: AsyncSession = Depends(get_db)):
     task_comment_service = TaskCommentService(db)
-    return await task_comment_service.create_task_comment(task_id, int(current_user["sub"]), comment)    
+    return await task_comment_service.create_task_comment(task_id, current_user.id, comment)    
 
 @router.get("/", response_model=TaskCommentListResponse)
-async def get_task_comments(task_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "get_task_comments"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def get_task_comments(task_id: int, page: PageParams = Depends(), current_user: CurrentUser = Depends(require_permission("get_task_comments")), db: AsyncSession = Depends(get_db)):
     task_comment_service = TaskCommentService(db)
-    return await task_comment_service.get_task_comments(task_id)
+    return await task_comment_service.get_task_comments(task_id, page)
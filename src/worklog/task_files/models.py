@@ -8,7 +8,7 @@ class TaskFiles(Base):
     __tablename__ = 'task_files'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    task_id: Mapped[int] = mapped_column(Integer)
+    task_id: Mapped[int] = mapped_column(Integer, index=True)
     original_filename: Mapped[str] = mapped_column(String)
     new_filename: Mapped[str] = mapped_column(String)
 
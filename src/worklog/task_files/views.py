@@ -4,8 +4,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from .service import TaskFilesService
 from .schemas import TaskFileResponse, TaskFileList
 from src.worklog.db.core import get_db
-from src.worklog.config.auth import auth
-from src.worklog.rules.permissions import PermissionService
+from src.worklog.rules.permissions import require_permission
+from src.worklog.auth.dependencies import CurrentUser
 
 router = APIRouter(prefix="/api/v1/task_files", tags=["🗂️TASK FILES - document-vault"])
 
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/api/v1/task_files", tags=["🗂️TASK FILES - docum
 async def get_task_files(
     task_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(auth.get_user_data_dependency())
+    current_user: CurrentUser = Depends(require_permission("get_task_files"))
 ):
     """
     Get all files attached to a task.
@@ -26,9 +26,6 @@ async def get_task_files(
     Returns:
         TaskFileList containing all files attached to the task
     """
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "get_task_files"):
-        raise HTTPException(status_code=403, detail="Forbidden")
     try:
         service = TaskFilesService(db)
         result = await service.get_task_files(task_id)
@@ -41,13 +38,10 @@ async def get_task_files(
 
 
 @router.post("/uploads/{task_id}")
-async def new_uploaded_file(task_id: int, uploaded_file: UploadFile, db: AsyncSession = Depends(get_db), current_user: dict = Depends(auth.get_user_data_dependency())):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "new_uploaded_file"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def new_uploaded_file(task_id: int, uploaded_file: UploadFile, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(require_permission("new_uploaded_file"))):
     handler = TaskFilesService(db)
     result = await handler._save_uploaded_file(uploaded_file)
-    task_result = await handler.create_task_file(task_id, result, int(current_user["sub"]))
+    task_result = await handler.create_task_file(task_id, result, current_user.id)
     return task_result
 
 
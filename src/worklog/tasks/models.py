@@ -1,6 +1,6 @@
 from src.worklog.db.core import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Boolean, DateTime, func, Text
+from sqlalchemy import String, Integer, Boolean, DateTime, func, Text, Index
 from datetime import datetime
 
 
@@ -19,16 +19,22 @@ class Tasks(Base):
 
 class TaskAssignees(Base):
     __tablename__ = 'task_assignees'
+    __table_args__ = (
+        Index('uq_task_assignees_task_id_user_id', 'task_id', 'user_id', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     task_id: Mapped[int] = mapped_column(Integer)
-    user_id: Mapped[int] = mapped_column(Integer)
+    user_id: Mapped[int] = mapped_column(Integer, index=True)
 
 
 class TaskDepartments(Base):
     __tablename__ = 'task_departments'
+    __table_args__ = (
+        Index('uq_task_departments_task_id_department_id', 'task_id', 'department_id', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     task_id: Mapped[int] = mapped_column(Integer)
-    department_id: Mapped[int] = mapped_column(Integer)
+    department_id: Mapped[int] = mapped_column(Integer, index=True)
 
@@ -47,11 +47,17 @@ class TaskDetailResponse(BaseModel):
     description: Optional[str] = Field(None, description="The description of the task")
     user_assigned: List[TaskUserResponse]
     departments: List[TaskDepartmentResponse]
+    checklist_total: int = Field(0, description="The number of checklist items")
+    checklist_done: int = Field(0, description="The number of checked checklist items")
+    comments_count: int = Field(0, description="The number of comments")
+    files_count: int = Field(0, description="The number of files")
 
 
 class TaskListResponse(BaseModel):
     tasks: List[TaskResponse] = Field(..., description="The list of tasks")
-    total: int = Field(..., description="The total number of tasks")
+    total: int = Field(..., description="The number of tasks on this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page")
+    estimated_total: Optional[int] = Field(None, description="Planner estimate of the total number of tasks")
 
     class Config:
         from_attributes = True
@@ -3,19 +3,89 @@ from fastapi import HTTPException
 from .schemas import *
 from .models import *
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, func, text, JSON
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.exc import IntegrityError
+from src.worklog.db.pagination import PageParams, paginate
 from src.worklog.departments.models import Department
 from src.worklog.auth.models import Users
+from src.worklog.task_checklist.models import TaskChecklist, TaskChecklistItem
+from src.worklog.task_comments.models import TaskComments
+from src.worklog.task_files.models import TaskFiles
 from src.worklog.rules.permissions import PermissionService
+from src.worklog.auth.dependencies import CurrentUser
 from src.worklog.notifications.service import NotificationService
-from src.worklog.ai.whatsapp_handler import WhatsappHandler
+from src.worklog.notifications.models import NotificationPriority
+from src.worklog.notifications.dispatcher import dispatcher as outbox_dispatcher
+
+
+def _json_list(query):
+    """Скалярный подзапрос json_agg, пустой список вместо NULL"""
+    return func.coalesce(query.scalar_subquery(), text("'[]'::json"), type_=JSON)
+
+
+def task_detail_query(task_id: int):
+    assignees = (
+        select(func.json_agg(aggregate_order_by(
+            func.json_build_object(
+                'id', Users.id,
+                'first_name', Users.first_name,
+                'last_name', Users.last_name,
+                'middle_name', Users.middle_name,
+                'position', Users.position,
+            ),
+            Users.id,
+        )))
+        .select_from(TaskAssignees)
+        .join(Users, Users.id == TaskAssignees.user_id)
+        .where(TaskAssignees.task_id == Tasks.id)
+    )
+    departments = (
+        select(func.json_agg(aggregate_order_by(
+            func.json_build_object('id', Department.id, 'name', Department.name),
+            Department.id,
+        )))
+        .select_from(TaskDepartments)
+        .join(Department, Department.id == TaskDepartments.department_id)
+        .where(TaskDepartments.task_id == Tasks.id)
+    )
+
+    def checklist_count(*conditions):
+        return (
+            select(func.count(TaskChecklistItem.id))
+            .join(TaskChecklist, TaskChecklist.id == TaskChecklistItem.checklist_id)
+            .where(TaskChecklist.task_id == Tasks.id, *conditions)
+            .scalar_subquery()
+        )
+
+    comments_count = (
+        select(func.count()).select_from(TaskComments)
+        .where(TaskComments.task_id == Tasks.id)
+        .scalar_subquery()
+    )
+    files_count = (
+        select(func.count()).select_from(TaskFiles)
+        .where(TaskFiles.task_id == Tasks.id)
+        .scalar_subquery()
+    )
+
+    return (
+        select(
+            Tasks,
+            _json_list(assignees).label('user_assigned'),
+            _json_list(departments).label('departments'),
+            checklist_count().label('checklist_total'),
+            checklist_count(TaskChecklistItem.is_checked.is_(True)).label('checklist_done'),
+            comments_count.label('comments_count'),
+            files_count.label('files_count'),
+        )
+        .where(Tasks.id == task_id)
+    )
 
 
 class TaskService:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.whatsapp_handler = WhatsappHandler()
 
     async def create_new_task_and_assign_me(self, task: CreateTask, user_id: int) -> TaskResponse:
         try:
@@ -154,8 +224,14 @@ class TaskService:
                 user_id=user_id)
 
             self.db.add(task_assignee)
-            result = await self.whatsapp_handler.send_message(f"Вы были назначены на задачу '{task.title}'! \n\n https://ortalyk.worklog.kz/tasks/{task.id}", user.chat_id_whatsapp)
+            NotificationService(self.db).enqueue_whatsapp(
+                f"Вы были назначены на задачу '{task.title}'! \n\n https://ortalyk.worklog.kz/tasks/{task.id}",
+                user_id=user.id,
+                chat_id=user.chat_id_whatsapp,
+                priority=NotificationPriority.ASSIGNMENT,
+            )
             await self.db.commit()
+            outbox_dispatcher.wake()
             await self.db.refresh(task)
             return TaskResponse(
                 id=task.id,
@@ -271,25 +347,28 @@ class TaskService:
             raise e
     
 
-    async def get_all_my_tasks(self, user_id: int) -> TaskListResponse:
+    async def _task_page(self, query, page: PageParams = None) -> TaskListResponse:
+        page = await paginate(self.db, query, (Tasks.id,), page or PageParams())
+        tasks = [row.Tasks for row in page.rows]
+        return TaskListResponse(
+            tasks=[TaskResponse(id=task.id, title=task.title, status=task.status, priority=task.priority) for task in tasks],
+            total=len(tasks),
+            next_cursor=page.next_cursor,
+            estimated_total=page.estimated_total
+        )
+
+    async def get_all_my_tasks(self, user_id: int, page: PageParams = None) -> TaskListResponse:
         try:
-            # Check if user exists
-            user = await self.db.get(Users, user_id)
-            if not user:
-                raise ValueError(f"User with id {user_id} not found")
-
             query = select(Tasks).join(
                 TaskAssignees,
                 Tasks.id == TaskAssignees.task_id
             ).where(TaskAssignees.user_id == user_id)
             
-            result = await self.db.execute(query)
-            tasks = result.scalars().all()
-            return TaskListResponse(tasks=[TaskResponse(id=task.id, title=task.title, status=task.status, priority=task.priority) for task in tasks], total=len(tasks))
+            return await self._task_page(query, page)
         except Exception as e:
             raise e
 
-    async def get_all_tasks_by_department(self, department_id: int) -> TaskListResponse:
+    async def get_all_tasks_by_department(self, department_id: int, page: PageParams = None) -> TaskListResponse:
         try:
             # Check if department exists
             department = await self.db.get(Department, department_id)
@@ -301,9 +380,7 @@ class TaskService:
                 Tasks.id == TaskDepartments.task_id
             ).where(TaskDepartments.department_id == department_id)
             
-            result = await self.db.execute(query)
-            tasks = result.scalars().all()
-            return TaskListResponse(tasks=[TaskResponse(id=task.id, title=task.title, status=task.status, priority=task.priority) for task in tasks], total=len(tasks))
+            return await self._task_page(query, page)
         except Exception as e:
             raise e
 
@@ -323,44 +400,14 @@ class TaskService:
             
 
     async def get_task_by_id(self, task_id: int) -> TaskDetailResponse:
+        """Задача с исполнителями, отделами и счётчиками за один запрос"""
         try:
-            task = await self.db.get(Tasks, task_id)
-            if not task:
+            result = await self.db.execute(task_detail_query(task_id))
+            row = result.one_or_none()
+            if not row:
                 raise ValueError(f"Task with id {task_id} not found")
-            
-            # Get assignees for this task
-            assignees_query = select(TaskAssignees).where(TaskAssignees.task_id == task_id)
-            assignees_result = await self.db.execute(assignees_query)
-            assignees = assignees_result.scalars().all()
-            
-            # Get departments for this task
-            departments_query = select(TaskDepartments).where(TaskDepartments.task_id == task_id)
-            departments_result = await self.db.execute(departments_query)
-            departments = departments_result.scalars().all()
-            
-            # Get user details for assignees
-            user_assigned = []
-            for assignee in assignees:
-                user = await self.db.get(Users, assignee.user_id)
-                if user:
-                    user_assigned.append(TaskUserResponse(
-                        id=user.id,
-                        first_name=user.first_name,
-                        last_name=user.last_name,
-                        middle_name=user.middle_name,
-                        position=user.position
-                    ))
-            
-            # Get department details
-            department_details = []
-            for dept in departments:
-                department = await self.db.get(Department, dept.department_id)
-                if department:
-                    department_details.append(TaskDepartmentResponse(
-                        id=department.id,
-                        name=department.name
-                    ))
-            
+
+            task = row.Tasks
             return TaskDetailResponse(
                 id=task.id,
                 title=task.title,
@@ -368,8 +415,12 @@ class TaskService:
                 status=task.status,
                 priority=task.priority,
                 due_date=task.due_date,
-                user_assigned=user_assigned,
-                departments=department_details
+                user_assigned=[TaskUserResponse(**user) for user in row.user_assigned],
+                departments=[TaskDepartmentResponse(**department) for department in row.departments],
+                checklist_total=row.checklist_total,
+                checklist_done=row.checklist_done,
+                comments_count=row.comments_count,
+                files_count=row.files_count
             )
         except Exception as e:
             raise e
@@ -429,19 +480,19 @@ class TaskShowSerivce:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_list_which_user_can_see(self, user_id: int) -> TaskListResponse:
+    async def get_list_which_user_can_see(self, current_user: CurrentUser) -> TaskListResponse:
         dep_list = []
         total = 0
+        permissions = PermissionService(self.db)
     
-        if await PermissionService(self.db).user_access_control(user_id, "get_all_my_tasks"):
-            db_user = await self.db.get(Users, user_id)
+        if await permissions.has_permission(current_user.user, "get_all_my_tasks"):
+            db_user = current_user.user
             dep_list.append({
                 "id": None,
                 "name": "my_tasks",
                 "display_name": f'{db_user.first_name} {db_user.last_name}'
             })
-            department_db = await self.db.execute(select(Department).where(Department.id == db_user.department_id))
-            department_db = department_db.scalars().first()
+            department_db = current_user.department
             if department_db:
                 dep_list.append({
                     "id": department_db.id,
@@ -451,7 +502,7 @@ class TaskShowSerivce:
                 total += 1
             total += 1
 
-        if await PermissionService(self.db).user_access_control(user_id, "show_all_department_tasks"):
+        if await permissions.has_permission(current_user.user, "show_all_department_tasks"):
             db_departments = await self.db.execute(select(Department))
             for dep in db_departments.scalars().all():
                 dep_list.append({
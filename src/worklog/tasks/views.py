@@ -2,92 +2,70 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from src.worklog.tasks.schemas import *
 from src.worklog.tasks.service import TaskService, TaskShowSerivce
 from src.worklog.db.core import get_db
+from src.worklog.db.pagination import PageParams
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.worklog.config.auth import auth
-from src.worklog.rules.permissions import PermissionService
+from src.worklog.rules.permissions import require_permission
+from src.worklog.auth.dependencies import CurrentUser, get_current_user
 
 router = APIRouter(prefix="/api/v1/tasks", tags=["🔍TASKS - task-manager"])
 
 
 @router.post("/", response_model=TaskResponse)
-async def create_task(task: CreateTask, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "create_task"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def create_task(task: CreateTask, current_user: CurrentUser = Depends(require_permission("create_task")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
-    return await task_service.create_new_task_and_assign_me(task, int(current_user["sub"]))
+    return await task_service.create_new_task_and_assign_me(task, current_user.id)
 
 @router.post("/department/{department_id}", response_model=TaskResponse)
-async def create_task(task: CreateTask, department_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "create_task"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def create_task(task: CreateTask, department_id: int, current_user: CurrentUser = Depends(require_permission("create_task")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
-    task = await task_service.create_new_task_and_assign_me(task, int(current_user["sub"]))
+    task = await task_service.create_new_task_and_assign_me(task, current_user.id)
     await task_service.add_new_department_to_task(task.id, department_id)
     return task
 
 
 @router.get("/my-tasks", response_model=TaskListResponse)
-async def get_all_my_tasks(current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "get_all_my_tasks"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def get_all_my_tasks(page: PageParams = Depends(), current_user: CurrentUser = Depends(require_permission("get_all_my_tasks")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
-    return await task_service.get_all_my_tasks(int(current_user["sub"]))
+    return await task_service.get_all_my_tasks(current_user.id, page)
 
 @router.get("/department-tasks", response_model=TaskListResponse)
-async def get_all_department_tasks(department_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
+async def get_all_department_tasks(department_id: int, page: PageParams = Depends(), current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
-    return await task_service.get_all_tasks_by_department(department_id)
+    return await task_service.get_all_tasks_by_department(department_id, page)
 
 @router.get('/task/show-list')
-async def get_list_which_user_can_see(current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
+async def get_list_which_user_can_see(current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     handler = TaskShowSerivce(db)
-    return await handler.get_list_which_user_can_see(int(current_user["sub"]))
+    return await handler.get_list_which_user_can_see(current_user)
 
 
 @router.post('/task/add-user', response_model=TaskResponse)
-async def add_user_to_task(task_id: int, user_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "add_user_to_task"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def add_user_to_task(task_id: int, user_id: int, current_user: CurrentUser = Depends(require_permission("add_user_to_task")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
     return await task_service.add_new_user_to_task(task_id, user_id)
 
 
 @router.post('/task/add-department', response_model=TaskResponse)
-async def add_department_to_task(task_id: int, department_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "add_department_to_task"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def add_department_to_task(task_id: int, department_id: int, current_user: CurrentUser = Depends(require_permission("add_department_to_task")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
     return await task_service.add_new_department_to_task(task_id, department_id)
 
 
 @router.delete('/task/remove/user/{task_id}/{user_id}', response_model=bool)
-async def remove_user_from_task(task_id: int, user_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "remove_user_from_task"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def remove_user_from_task(task_id: int, user_id: int, current_user: CurrentUser = Depends(require_permission("remove_user_from_task")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
     return await task_service.remove_user_from_task(task_id, user_id)   
 
 
 @router.delete('/task/remove/department/{task_id}/{department_id}', response_model=bool)
-async def remove_department_from_task(task_id: int, department_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "remove_department_from_task"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def remove_department_from_task(task_id: int, department_id: int, current_user: CurrentUser = Depends(require_permission("remove_department_from_task")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
     return await task_service.remove_department_from_task(task_id, department_id)
 
 
 @router.put('/task/change-status', response_model=TaskResponse)
-async def change_task_status(task_id: int, status: str, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "change_task_status"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def change_task_status(task_id: int, status: str, current_user: CurrentUser = Depends(require_permission("change_task_status")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
     return await task_service.task_change_status(task_id, status)
 
@@ -97,10 +75,7 @@ async def change_task_data(task_id: int, data: UpdateTask, current_user: dict= D
     return await task_service.update_task_data(task_id, data)
 
 @router.get('/task/details/{task_id}', response_model=TaskDetailResponse)
-async def get_task_details(task_id: int, current_user: dict = Depends(auth.get_user_data_dependency()), db: AsyncSession = Depends(get_db)):
-    permission_service = PermissionService(db)
-    if not await permission_service.user_access_control(current_user['sub'], "get_task_details"):
-        raise HTTPException(status_code=403, detail="Forbidden")
+async def get_task_details(task_id: int, current_user: CurrentUser = Depends(require_permission("get_task_details")), db: AsyncSession = Depends(get_db)):
     task_service = TaskService(db)
     return await task_service.get_task_by_id(task_id)
 
@@ -10,6 +10,8 @@ class BaseUser(BaseModel):
 class UserList(BaseModel):
     users: list[BaseUser]
     total_users: int
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
 
 class RoleUser(BaseModel):
     id: int
@@ -40,3 +42,5 @@ class UserRead(BaseModel):
 class UserServiceBase(BaseModel):
     users: list[UserRead]
     total_users: int
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
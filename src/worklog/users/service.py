@@ -1,3 +1,4 @@
+from typing import Optional, Sequence
 from .schemas import *
 from src.worklog.auth.models import Users
 from src.worklog.departments.models import Department
@@ -6,14 +7,70 @@ from src.worklog.rules.models import Roles
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
+from src.worklog.db.pagination import PageParams, paginate
+
+
+def user_read_query():
+    """Пользователи вместе с отделом, сменой и ролью одним запросом"""
+    return (
+        select(Users, Department, Shift, Roles)
+        .outerjoin(Department, Department.id == Users.department_id)
+        .outerjoin(Shift, Shift.id == Users.shift_id)
+        .outerjoin(Roles, Roles.id == Users.role)
+    )
+
+
+def build_user_read(
+    user: Users,
+    department: Optional[Department] = None,
+    shift: Optional[Shift] = None,
+    role: Optional[Roles] = None,
+) -> UserRead:
+    return UserRead(
+        id=user.id,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        middle_name=user.middle_name,
+        phone=user.phone,
+        position=user.position,
+        department=DepartmentUser(id=department.id, display_name=department.name) if department else None,
+        shift=ShiftUser(id=shift.id, display_name=shift.name) if shift else None,
+        role=RoleUser(id=role.id, name=role.name) if role else None,
+        is_superuser=user.is_superuser
+    )
+
+
+async def _load_by_id(db: AsyncSession, model, ids: set[int]) -> dict:
+    if not ids:
+        return {}
+    result = await db.execute(select(model).where(model.id.in_(ids)))
+    return {row.id: row for row in result.scalars().all()}
+
+
+async def assemble_user_reads(db: AsyncSession, users: Sequence[Users]) -> list[UserRead]:
+    """UserRead для уже загруженных пользователей: по одному IN-запросу на отделы, смены и роли"""
+    departments = await _load_by_id(db, Department, {user.department_id for user in users if user.department_id})
+    shifts = await _load_by_id(db, Shift, {user.shift_id for user in users if user.shift_id})
+    roles = await _load_by_id(db, Roles, {user.role for user in users if user.role})
+
+    return [
+        build_user_read(
+            user,
+            departments.get(user.department_id),
+            shifts.get(user.shift_id),
+            roles.get(user.role),
+        )
+        for user in users
+    ]
+
 
 class UserService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_users(self, skip: int = 0, limit: int = 100) -> UserList:
-        users = await self.db.execute(select(Users).order_by(Users.id).offset(skip).limit(limit))
-        users = users.scalars().all()
+    async def get_users(self, page: PageParams = None) -> UserList:
+        page = await paginate(self.db, select(Users), (Users.id,), page or PageParams())
+        users = [row.Users for row in page.rows]
         return UserList(
             users=[
                 BaseUser(
@@ -24,60 +81,18 @@ class UserService:
                     position=user.position
                 ) for user in users
             ], 
-            total_users=len(users))
+            total_users=len(users),
+            next_cursor=page.next_cursor,
+            estimated_total=page.estimated_total)
+
+    async def get_user_profiles(self, page: PageParams = None) -> UserServiceBase:
+        """Получение профилей пользователей постранично"""
+        page = await paginate(self.db, user_read_query(), (Users.id,), page or PageParams())
+        result_users = [build_user_read(*row) for row in page.rows]
 
-    async def get_user_profiles(self) -> UserServiceBase:
-        """Получение профилей всех пользователей"""
-        users = await self.db.execute(
-            select(Users).order_by(Users.id)
-        )
-        users = users.scalars().all()
-        
-        if not users:
-            return UserServiceBase(users=[], total_users=0)
-        
-        result_users = []
-        for user in users:
-            # Получаем данные отдела и смены
-            department = None
-            shift = None
-            role = None
-            
-            if user.department_id:
-                department = await self.db.execute(
-                    select(Department).where(Department.id == user.department_id)
-                )
-                department = department.scalar_one_or_none()
-            
-            if user.shift_id:
-                shift = await self.db.execute(
-                    select(Shift).where(Shift.id == user.shift_id)
-                )
-                shift = shift.scalar_one_or_none()
-            
-            if user.role:
-                role = await self.db.execute(
-                    select(Roles).where(Roles.id == user.role)
-                )
-                role = role.scalar_one_or_none()
-            
-            result_users.append(
-                UserRead(
-                    id=user.id,
-                    first_name=user.first_name,
-                    last_name=user.last_name,
-                    middle_name=user.middle_name,
-                    phone=user.phone,
-                    position=user.position,
-                    department=DepartmentUser(id=department.id, display_name=department.name) if department else None,
-                    shift=ShiftUser(id=shift.id, display_name=shift.name) if shift else None,
-                    role=RoleUser(id=role.id, name=role.name) if role else None,
-                    is_superuser=user.is_superuser
-                )
-            )
-        
         return UserServiceBase(
             users=result_users,
-            total_users=len(result_users)
+            total_users=len(result_users),
+            next_cursor=page.next_cursor,
+            estimated_total=page.estimated_total
         )
-    
\ No newline at end of file
@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Index
 from sqlalchemy.sql.sqltypes import String, Integer, Float, Boolean
 
 from src.worklog.db.core import Base
@@ -6,6 +7,9 @@ from src.worklog.db.core import Base
 
 class Wells(Base):
     __tablename__ = 'wells'
+    __table_args__ = (
+        Index('ix_wells_block_id_out', 'block_id', 'out'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -30,6 +30,8 @@ class WellsListResponse(BaseModel):
     wells: List[WellsResponse]
     block_id: int
     total: int
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
 
     class Config:
         from_attributes = True
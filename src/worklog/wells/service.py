@@ -4,6 +4,7 @@ from .schema import *
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from sqlalchemy import select
+from src.worklog.db.pagination import PageParams, paginate
 from typing import Optional
 
 class WellsService:
@@ -42,14 +43,18 @@ class WellsService:
             await self.db.rollback()
             raise HTTPException(status_code=500, detail={"status": "error", "message": str(e)})
     
-    async def get_wells(self, block_id: int) -> WellsListResponse:
+    async def get_wells(self, block_id: int, page: PageParams = None) -> WellsListResponse:
         try:
-            wells = await self.db.execute(select(Wells).where(Wells.block_id == block_id))
-            wells_list = wells.scalars().all()
+            page = await paginate(
+                self.db, select(Wells).where(Wells.block_id == block_id), (Wells.id,), page or PageParams()
+            )
+            wells_list = [row.Wells for row in page.rows]
             return WellsListResponse(
                 wells=wells_list,
                 block_id=block_id,
-                total=len(wells_list)
+                total=len(wells_list),
+                next_cursor=page.next_cursor,
+                estimated_total=page.estimated_total
             )
         except Exception as e:
             raise HTTPException(status_code=500, detail={"status": "error", "message": str(e)})
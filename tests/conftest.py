@@ -0,0 +1,14 @@
+import os
+
+# Settings читаются при импорте приложения; для юнит-тестов хватает заглушек
+for name, value in {
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "TELEGRAM_API_KEY": "test",
+    "WHATSAPP_API_KEY": "test",
+    "JWT_SECRET_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,34 @@
+import pytest
+
+from src.worklog.ai.intents import match_intent
+
+
+@pytest.mark.parametrize("text, task_id", [
+    ("задача 3 выполнена", 3),
+    ("Закрой задачу №12", 12),
+    ("я сделал задачу 4", 4),
+    ("тапсырма 5 орындалды", 5),
+    ("7 тапсырма дайын", 7),
+])
+def test_task_done_commands(text, task_id):
+    match = match_intent(text)
+    assert match is not None and match.intent == "task_done"
+    assert match.params["task_id"] == task_id
+
+
+@pytest.mark.parametrize("text", [
+    "задача 3 готова?",
+    "готова ли задача 3",
+    "тапсырма 2 дайын ба",
+    "тапсырма 1 бітті ме?",
+    "номер 7 закрыта",
+    "5 готова",
+    "2 дайын",
+    "1 бітті",
+])
+def test_questions_and_bare_numbers_go_to_model(text):
+    assert match_intent(text) is None
+
+
+def test_my_tasks_question_is_answered():
+    assert match_intent("какие у меня задачи?").intent == "my_tasks"